@@ -1,19 +1,195 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache, partial
+
+import requests
+from fastapi import BackgroundTasks, FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from kubiya_workflow_sdk import execute_workflow, validate_workflow_definition
 
-from workflow import build_workflow
+from pipeline import local_executor, stream_events
+from pipeline.admission import DEGRADED, AdmissionController, AdmissionThresholds
+from pipeline.bundles import get_bundle
+from pipeline.clustering import Cluster, StormClusters, fingerprint
+from pipeline.deadlines import Deadline
+from pipeline.flaky import FailedLogs, FlakyTracker, scan_failed_logs
+from pipeline.integrations import IntegrationCache, fetch_integration
+from pipeline.janitor import Janitor
+from pipeline.ledger import RunLedger
+from pipeline.memo import MemoPlan, StepMemo
+from pipeline.prefetch import PrefetchRegistry, fetch_workflow_run
+from pipeline.runners import RunnerPool, RunnerSpec
+from tools.gh.get_failed_logs import list_failed_jobs
+from workflow import SIDE_EFFECT_STEPS, build_workflow
 
 
 class WorkflowRunnerSettings(BaseSettings):
+    # "local" runs workflows in-process with pipeline.local_executor; its
+    # agent steps are answered with the contents of LOCAL_AGENT_RESPONSE
+    # (without one they fail and the comment falls back to the degraded one)
     runner: str = "demo"
+    LOCAL_AGENT_RESPONSE: str = ""
+
+    # Pool of runners, e.g. [{"name": "demo", "weight": 2, "max_concurrency": 8}];
+    # when empty every execution goes to ``runner``
+    RUNNERS: list[RunnerSpec] = []
+    RUNNER_EJECT_AFTER_FAILURES: int = 3
+    RUNNER_EJECT_SECONDS: float = 60
 
     KUBIYA_HOST: str = ""
     KUBIYA_API_KEY: str = ""
     GH_TOKEN: str = ""
 
+    STATE_DIR: str = "./state"
+
+    # Kubiya integrations injected into each workflow as secrets
+    INTEGRATIONS: dict[str, str] = {"slack": "SLACK_TOKEN"}
+    INTEGRATIONS_TTL_SECONDS: int = 3600
+
+    # End-to-end budget from receiving an event to the PR comment being posted
+    SLO_SECONDS: int = 900
+
+    # How long a workflow_run event waits for an in-flight prefetch of its run
+    PREFETCH_WAIT_SECONDS: int = 600
+    # Prefetch claims of runs that never completed with a failure are dropped after this
+    PREFETCH_CLAIM_MAX_AGE_HOURS: float = 24
+
+    # Failures of tests whose outcome flipped between attempts at the same
+    # commit more often than this, within the window, skip the analysis
+    FLAKY_THRESHOLD: float = 0.3
+    FLAKY_WINDOW_DAYS: int = 14
+    # Tests compared across fewer reruns than this are never taken as flaky
+    FLAKY_MIN_TRANSITIONS: int = 3
+
+    # Failures whose logs fingerprint alike within this window share one
+    # analysis; followers wait this long for it before analyzing on their own
+    # and then run on a pool of this many workers
+    STORM_WINDOW_SECONDS: int = 600
+    STORM_WAIT_SECONDS: int = 420
+    STORM_FOLLOWER_WORKERS: int = 8
+
+    # Past any high-water mark new events get the degraded workflow (no
+    # agent analysis) until all signals drop below their low-water marks
+    ADMISSION_QUEUE_HIGH: int = 20
+    ADMISSION_QUEUE_LOW: int = 5
+    ADMISSION_IN_FLIGHT_HIGH: int = 10
+    ADMISSION_IN_FLIGHT_LOW: int = 4
+    ADMISSION_LATENCY_HIGH_SECONDS: float = 420
+    ADMISSION_LATENCY_LOW_SECONDS: float = 240
+    ADMISSION_MIN_DWELL_SECONDS: float = 60
+
+    # Finished events are kept in the run ledger this long
+    LEDGER_RETENTION_DAYS: int = 7
+
+    # Per-run artifact directories on the shared volume, as mounted here
+    # (defaults to the local runner's volume), and their cleanup limits
+    ARTIFACTS_DIR: str = ""
+    ARTIFACTS_MAX_AGE_HOURS: float = 24
+    ARTIFACTS_MAX_TOTAL_MB: int = 10240
+    JANITOR_INTERVAL_SECONDS: float = 300
+
+    # Recorded workflow definitions and streams for pipeline.critical_path
+    STREAMS_MAX_AGE_HOURS: float = 72
+    STREAMS_MAX_TOTAL_MB: int = 1024
+
+    # Memoized step outputs, evicted least recently used first
+    MEMO_MAX_AGE_HOURS: float = 72
+    MEMO_MAX_TOTAL_MB: int = 1024
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
 
+@lru_cache
+def get_settings() -> WorkflowRunnerSettings:
+    return WorkflowRunnerSettings()
+
+
+@lru_cache
+def get_admission_controller() -> AdmissionController:
+    config = get_settings()
+    return AdmissionController(
+        AdmissionThresholds(
+            queue_high=config.ADMISSION_QUEUE_HIGH,
+            queue_low=config.ADMISSION_QUEUE_LOW,
+            in_flight_high=config.ADMISSION_IN_FLIGHT_HIGH,
+            in_flight_low=config.ADMISSION_IN_FLIGHT_LOW,
+            latency_high=config.ADMISSION_LATENCY_HIGH_SECONDS,
+            latency_low=config.ADMISSION_LATENCY_LOW_SECONDS,
+            min_dwell=config.ADMISSION_MIN_DWELL_SECONDS,
+        )
+    )
+
+
+@lru_cache
+def get_runner_pool() -> RunnerPool:
+    config = get_settings()
+    return RunnerPool(
+        config.RUNNERS or [RunnerSpec(name=config.runner)],
+        eject_after=config.RUNNER_EJECT_AFTER_FAILURES,
+        eject_seconds=config.RUNNER_EJECT_SECONDS,
+    )
+
+
+@lru_cache
+def get_run_ledger(state_dir: str) -> RunLedger:
+    return RunLedger(f"{state_dir}/ledger.db")
+
+
+@lru_cache
+def get_prefetch_registry(state_dir: str) -> PrefetchRegistry:
+    return PrefetchRegistry(f"{state_dir}/prefetch")
+
+
+@lru_cache
+def get_flaky_tracker() -> FlakyTracker:
+    config = get_settings()
+    return FlakyTracker(
+        f"{config.STATE_DIR}/flaky.db",
+        config.FLAKY_WINDOW_DAYS * 86400,
+        config.FLAKY_THRESHOLD,
+        min_transitions=config.FLAKY_MIN_TRANSITIONS,
+    )
+
+
+@lru_cache
+def get_storm_clusters() -> StormClusters:
+    config = get_settings()
+    return StormClusters(
+        config.STORM_WINDOW_SECONDS,
+        retention_seconds=config.SLO_SECONDS,
+        max_workers=config.STORM_FOLLOWER_WORKERS,
+    )
+
+
+@lru_cache
+def get_integration_cache(host: str, api_key: str, ttl: int) -> IntegrationCache:
+    return IntegrationCache(lambda name: fetch_integration(host, api_key, name), ttl)
+
+
+def integration_secrets(config: WorkflowRunnerSettings) -> dict[str, str]:
+    """Secrets for the configured integrations that could be resolved."""
+    if not config.KUBIYA_HOST:
+        return {}
+
+    cache = get_integration_cache(
+        config.KUBIYA_HOST, config.KUBIYA_API_KEY, config.INTEGRATIONS_TTL_SECONDS
+    )
+    secrets = {}
+    for integration, secret_name in config.INTEGRATIONS.items():
+        try:
+            secrets[secret_name] = cache.get(integration)
+        except requests.RequestException as e:
+            print(f"Could not resolve integration {integration}: {e}")
+    return secrets
+
+
 def parse_gh_webhook_payload(raw_payload: dict) -> dict:
     payload = {
         "workflow_run_id": raw_payload["workflow_run"]["id"],
@@ -22,6 +198,9 @@ def parse_gh_webhook_payload(raw_payload: dict) -> dict:
         "pr_title": raw_payload["workflow_run"]["display_title"],
         "pr_url": raw_payload["workflow_run"]["pull_requests"][0]["url"],
         "pr_number": raw_payload["workflow_run"]["pull_requests"][0]["number"],
+        "base_sha": raw_payload["workflow_run"]["pull_requests"][0]["base"]["sha"],
+        "head_sha": raw_payload["workflow_run"]["pull_requests"][0]["head"]["sha"],
+        "run_attempt": raw_payload["workflow_run"].get("run_attempt", 1),
         "repo_url": raw_payload["repository"]["full_name"],
         "author": raw_payload["workflow_run"]["triggering_actor"]["login"],
         "triggered_at": raw_payload["workflow_run"]["updated_at"],
@@ -29,25 +208,486 @@ def parse_gh_webhook_payload(raw_payload: dict) -> dict:
     return payload
 
 
-with open('./with_files.json') as f:
-    import json
-    a = json.load(f)
+def redact(value, secrets: list[str]):
+    """``value`` with every occurrence of the ``secrets`` masked, in nested dicts and lists too."""
+    if isinstance(value, str):
+        for secret in secrets:
+            value = value.replace(secret, "***")
+        return value
+    if isinstance(value, dict):
+        return {key: redact(item, secrets) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item, secrets) for item in value]
+    return value
 
 
-if __name__ == "__main__":
-    from gh_payload import raw_payload
+def run_workflow(
+    payload: dict,
+    config: WorkflowRunnerSettings,
+    deadline: Deadline,
+    delivery_id: str | None = None,
+    cluster: Cluster | None = None,
+    **build_options,
+) -> str | None:
+    """Build and execute the workflow; returns the analysis, if one finished.
 
-    config = WorkflowRunnerSettings()
-    payload = parse_gh_webhook_payload(raw_payload=raw_payload)
+    A leader ``cluster`` gets the analysis too.
+    """
+    ledger = get_run_ledger(config.STATE_DIR)
+    completed_steps = {}
+    if delivery_id:
+        completed_steps = {
+            step: output
+            for step, output in ledger.completed_steps(delivery_id).items()
+            if step in SIDE_EFFECT_STEPS
+        }
 
-    workflow = build_workflow(GH_TOKEN=config.GH_TOKEN, **payload)
+    memo_plan = MemoPlan(StepMemo(f"{config.STATE_DIR}/memo"))
+    secrets = integration_secrets(config)
+    workflow = build_workflow(
+        GH_TOKEN=config.GH_TOKEN,
+        secrets=secrets,
+        memo_plan=memo_plan,
+        deadline=deadline,
+        completed_steps=completed_steps,
+        **build_options,
+        **payload,
+    )
+    if memo_plan.satisfied:
+        print(f"Reusing cached results for steps: {', '.join(sorted(memo_plan.satisfied))}")
     workflow_definition = workflow.model_dump(exclude_none=True, exclude_defaults=True)
 
     validate_workflow_definition(workflow_definition)
 
-    for line in execute_workflow(
-        workflow_definition=workflow_definition,
-        api_key=config.KUBIYA_API_KEY,
-        runner=config.runner,
+    # Timed copy of the stream for pipeline.critical_path, without the secrets
+    secret_values = [value for value in (config.GH_TOKEN, *secrets.values()) if value]
+    streams_dir = f"{config.STATE_DIR}/streams"
+    os.makedirs(streams_dir, exist_ok=True)
+    stream_path = (
+        f"{streams_dir}/{payload['workflow_run_id']}-{payload['run_attempt']}-{int(time.time())}"
+    )
+    with open(f"{stream_path}.definition.json", "w") as f:
+        json.dump(redact(workflow_definition, secret_values), f, default=str)
+
+    admission = get_admission_controller()
+    step_started_at = {}
+    admission.execution_started()
+    analysis = None
+    try:
+        with (
+            get_runner_pool().lease(timeout=max(0.0, deadline.remaining())) as lease,
+            open(f"{stream_path}.jsonl", "a") as stream_log,
+        ):
+            if lease.runner == "local":
+                execute = partial(
+                    local_executor.execute_workflow,
+                    shared_dir=f"{config.STATE_DIR}/shared",
+                    agent_responder=(
+                        local_executor.file_responder(config.LOCAL_AGENT_RESPONSE)
+                        if config.LOCAL_AGENT_RESPONSE
+                        else None
+                    ),
+                )
+            else:
+                execute = execute_workflow
+
+            # A stream that stops before the workflow ends counts against the runner
+            lease.succeeded = False
+            for line in execute(
+                workflow_definition=workflow_definition,
+                api_key=config.KUBIYA_API_KEY,
+                runner=lease.runner,
+            ):
+                print(line)
+                memo_plan.observe(line)
+                received_at = time.time()
+                record = {"received_at": received_at, "line": redact(line, secret_values)}
+                stream_log.write(json.dumps(record, default=str) + "\n")
+
+                if not (event := stream_events.parse_event(line)):
+                    continue
+                if stream_events.workflow_ended(event):
+                    lease.succeeded = True
+                finished = stream_events.step_finished(event)
+                # Only steps that are skipped on resume need their output kept
+                if delivery_id and finished and finished[1] and finished[0] in SIDE_EFFECT_STEPS:
+                    ledger.step_finished(delivery_id, finished[0], finished[2])
+                if finished and finished[0] == "failure-analysis" and finished[1]:
+                    analysis = finished[2]
+                if name := stream_events.step_started(event):
+                    step_started_at[name] = received_at
+                elif finished and finished[0] in step_started_at:
+                    admission.observe_step(
+                        finished[0], received_at - step_started_at.pop(finished[0])
+                    )
+    finally:
+        admission.execution_finished()
+        # Followers fall back to their own analysis if the leader has none
+        if cluster is not None:
+            cluster.resolve(analysis)
+    return analysis
+
+
+def fetch_logs(
+    payload: dict,
+    config: WorkflowRunnerSettings,
+    deadline: Deadline,
+    failed_job_id: int | None = None,
+) -> FailedLogs:
+    """Failed tests and log tail of a run attempt; empty if they could not be fetched."""
+    try:
+        return scan_failed_logs(
+            config.GH_TOKEN,
+            payload["repo_url"],
+            payload["workflow_run_id"],
+            payload["run_attempt"],
+            job_id=failed_job_id,
+            deadline=deadline.expires_at,
+        )
+    except requests.RequestException as e:
+        print(f"Could not fetch failed logs, running full analysis: {e}")
+        return FailedLogs(tests=set(), tail="")
+
+
+def find_known_flaky(payload: dict, logs: FailedLogs, record: bool = True) -> list[str]:
+    """Record the failed tests of a run attempt; the ids if all of them are flaky.
+
+    Pass ``record=False`` for the logs of only some of the failed jobs: tests
+    failing in the other jobs would otherwise be recorded as passed.
+    """
+    tracker = get_flaky_tracker()
+    failed_tests = logs.tests
+
+    # Without parsed tests there is nothing to tell apart a flaky run from,
+    # say, a broken build, and recording it would mark earlier failures passed.
+    if not failed_tests:
+        return []
+    if record:
+        tracker.record_attempt(
+            payload["repo_url"],
+            payload["workflow_name"],
+            payload["head_sha"],
+            payload["run_attempt"],
+            failed_tests,
+        )
+    return sorted(
+        tracker.known_flaky(payload["repo_url"], payload["workflow_name"], failed_tests)
+    )
+
+
+def join_storm(payload: dict, logs: FailedLogs) -> Cluster | None:
+    """The storm cluster of a failure analyzed in full; None if its logs have no errors."""
+    if not (key := fingerprint(logs.tail)):
+        return None
+    return get_storm_clusters().join(
+        key,
+        member=(payload["repo_url"], payload["workflow_run_id"], payload["run_attempt"]),
+        member_ref=f"{payload['repo_url']}#{payload['pr_number']}",
+    )
+
+
+def prefetched_scope(
+    run_key: tuple, config: WorkflowRunnerSettings, deadline: Deadline
+) -> tuple[int | None, str | None]:
+    """``(failed_job_id, prefetched_analysis)`` for the run-level workflow.
+
+    The run is narrowed to the prefetched job only when that job is its one
+    failure, so the memoized results are reused as they are. Otherwise every
+    failed job is analyzed, building on the early analysis of the first.
+    """
+    registry = get_prefetch_registry(config.STATE_DIR)
+    if not (prefetched_job_id := registry.job_id(*run_key)):
+        return None, None
+
+    try:
+        failed_jobs = list_failed_jobs(config.GH_TOKEN, *run_key, deadline=deadline.expires_at)
+    except requests.RequestException as e:
+        print(f"Could not list failed jobs, analyzing all of them: {e}")
+        failed_jobs = []
+    analysis = registry.analysis(*run_key)
+    registry.forget(*run_key)
+    if [job["id"] for job in failed_jobs] == [prefetched_job_id]:
+        return prefetched_job_id, None
+    return None, analysis
+
+
+def handle_workflow_run(
+    raw_payload: dict,
+    config: WorkflowRunnerSettings,
+    deadline: Deadline,
+    delivery_id: str | None = None,
+) -> Future | None:
+    """Analyze a failed workflow run and post the results.
+
+    Storm followers are handed to the storm clusters' pool; the returned
+    future finishes when they do.
+    """
+    run = raw_payload["workflow_run"]
+    if raw_payload.get("action") == "completed" and run.get("conclusion") == "success":
+        get_flaky_tracker().record_attempt(
+            raw_payload["repository"]["full_name"],
+            run["name"],
+            run["head_sha"],
+            run.get("run_attempt", 1),
+            failed_tests=(),
+        )
+        return
+    if (
+        raw_payload.get("action") != "completed"
+        or run.get("conclusion") != "failure"
+        or not run.get("pull_requests")
     ):
-        print(line)
+        return
+
+    payload = parse_gh_webhook_payload(raw_payload=raw_payload)
+    registry = get_prefetch_registry(config.STATE_DIR)
+    run_key = (payload["repo_url"], payload["workflow_run_id"], payload["run_attempt"])
+
+    # Let a prefetch started by an earlier job failure finish so its results
+    # are reused instead of analyzing the same failure twice.
+    registry.wait(*run_key, timeout=min(config.PREFETCH_WAIT_SECONDS, deadline.remaining()))
+    failed_job_id, prefetched_analysis = prefetched_scope(run_key, config, deadline)
+    logs = fetch_logs(payload, config, deadline, failed_job_id)
+    known_flaky = find_known_flaky(payload, logs)
+    degraded = not known_flaky and get_admission_controller().admit() == DEGRADED
+
+    cluster = None
+    if not known_flaky and not degraded and (cluster := join_storm(payload, logs)):
+        if not cluster.is_leader(run_key):
+            print(f"Waiting for the analysis of {cluster.leader_ref}, same failure")
+            return get_storm_clusters().follow(
+                cluster,
+                timeout=min(config.STORM_WAIT_SECONDS, deadline.remaining()),
+                run=lambda shared_analysis: run_workflow(
+                    payload,
+                    config,
+                    deadline,
+                    delivery_id=delivery_id,
+                    failed_job_id=failed_job_id,
+                    shared_analysis=shared_analysis,
+                ),
+            )
+    run_workflow(
+        payload,
+        config,
+        deadline,
+        delivery_id=delivery_id,
+        cluster=cluster,
+        failed_job_id=failed_job_id,
+        known_flaky=known_flaky,
+        degraded=degraded,
+        prefetched_analysis=prefetched_analysis,
+    )
+    return None
+
+
+def handle_workflow_job(
+    raw_payload: dict,
+    config: WorkflowRunnerSettings,
+    deadline: Deadline,
+    delivery_id: str | None = None,
+) -> None:
+    """Start fetching and analysis as soon as the first job of a run fails.
+
+    The results are memoized, so when that job is the run's only failure the
+    ``workflow_run`` event that follows only has to assemble and post them.
+    """
+    job = raw_payload["workflow_job"]
+    if raw_payload.get("action") != "completed" or job.get("conclusion") != "failure":
+        return
+
+    # Under load the completed run gets the degraded workflow anyway, so
+    # starting the analysis early would only add to the backlog.
+    if get_admission_controller().mode == DEGRADED:
+        return
+
+    repository = raw_payload["repository"]["full_name"]
+    registry = get_prefetch_registry(config.STATE_DIR)
+    run_key = (repository, job["run_id"], job["run_attempt"])
+    if not registry.claim(*run_key, job_id=job["id"]):
+        return
+
+    try:
+        run = fetch_workflow_run(config.GH_TOKEN, repository, job["run_id"])
+        if not run.get("pull_requests"):
+            return
+        run["run_attempt"] = job["run_attempt"]
+        payload = parse_gh_webhook_payload(
+            raw_payload={"workflow_run": run, "repository": raw_payload["repository"]}
+        )
+        # Known flaky failures get a templated comment once the run
+        # completes; there is no analysis worth starting early. The run's
+        # outcomes are recorded then, once every failed job is known.
+        logs = fetch_logs(payload, config, deadline, job["id"])
+        if find_known_flaky(payload, logs, record=False):
+            return
+        # Followers of a storm wait for their leader's analysis instead
+        cluster = join_storm(payload, logs)
+        if cluster is not None and not cluster.is_leader(run_key):
+            return
+        analysis = run_workflow(
+            payload,
+            config,
+            deadline,
+            delivery_id=delivery_id,
+            cluster=cluster,
+            failed_job_id=job["id"],
+            prefetch=True,
+        )
+        registry.record_analysis(*run_key, analysis)
+    finally:
+        registry.finish(*run_key)
+
+
+EVENT_HANDLERS = {
+    "workflow_run": handle_workflow_run,
+    "workflow_job": handle_workflow_job,
+}
+
+
+def handle_event(
+    event_name: str,
+    raw_payload: dict,
+    config: WorkflowRunnerSettings,
+    deadline: Deadline,
+    delivery_id: str | None = None,
+) -> None:
+    get_admission_controller().dequeued()
+    ledger = get_run_ledger(config.STATE_DIR)
+    if delivery_id:
+        ledger.started(delivery_id)
+
+    succeeded = False
+    deferred = None
+    try:
+        if handler := EVENT_HANDLERS.get(event_name):
+            deferred = handler(raw_payload, config, deadline, delivery_id=delivery_id)
+        succeeded = True
+    finally:
+        if delivery_id and deferred is None:
+            ledger.finished(delivery_id, succeeded)
+
+    # The event stays unfinished in the ledger until work handed off completes
+    if delivery_id and deferred is not None:
+        deferred.add_done_callback(
+            lambda done: ledger.finished(delivery_id, done.exception() is None)
+        )
+
+
+def resume_unfinished(config: WorkflowRunnerSettings, max_workers: int = 4) -> None:
+    """Re-enqueue events a previous process received but did not finish."""
+    ledger = get_run_ledger(config.STATE_DIR)
+    ledger.purge(config.LEDGER_RETENTION_DAYS * 86400)
+    if not (unfinished := ledger.unfinished()):
+        return
+
+    print(f"Resuming {len(unfinished)} unfinished events")
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resume")
+    for delivery_id, event_name, raw_payload in unfinished:
+        get_admission_controller().enqueued()
+        # The original deadline has passed; the resumed event gets a fresh one
+        pool.submit(
+            handle_event,
+            event_name,
+            raw_payload,
+            config,
+            Deadline.after(config.SLO_SECONDS),
+            delivery_id,
+        )
+    pool.shutdown(wait=False)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    config = get_settings()
+    janitor = Janitor(
+        config.ARTIFACTS_DIR or f"{config.STATE_DIR}/shared/runs",
+        max_age=config.ARTIFACTS_MAX_AGE_HOURS * 3600,
+        max_total_bytes=config.ARTIFACTS_MAX_TOTAL_MB * 1024 * 1024,
+        # Artifacts of a run may be in use until its deadline has passed
+        min_idle=config.SLO_SECONDS,
+    )
+    janitor.start(config.JANITOR_INTERVAL_SECONDS)
+    claims_janitor = Janitor(
+        f"{config.STATE_DIR}/prefetch",
+        max_age=config.PREFETCH_CLAIM_MAX_AGE_HOURS * 3600,
+        max_total_bytes=None,
+        min_idle=config.SLO_SECONDS,
+    )
+    claims_janitor.start(config.JANITOR_INTERVAL_SECONDS)
+    memo_janitor = Janitor(
+        f"{config.STATE_DIR}/memo",
+        max_age=config.MEMO_MAX_AGE_HOURS * 3600,
+        max_total_bytes=config.MEMO_MAX_TOTAL_MB * 1024 * 1024,
+        # A prefetch's results are reused by its run-level build
+        min_idle=config.SLO_SECONDS,
+    )
+    memo_janitor.start(config.JANITOR_INTERVAL_SECONDS)
+    streams_janitor = Janitor(
+        f"{config.STATE_DIR}/streams",
+        max_age=config.STREAMS_MAX_AGE_HOURS * 3600,
+        max_total_bytes=config.STREAMS_MAX_TOTAL_MB * 1024 * 1024,
+        # Streams are appended to until their run ends
+        min_idle=config.SLO_SECONDS,
+    )
+    streams_janitor.start(config.JANITOR_INTERVAL_SECONDS)
+    bundle = get_bundle()
+    print(f"Tool bundle {bundle.digest} ({len(bundle.archive)} bytes)")
+    resume_unfinished(config)
+    # resume_unfinished purges the ledger at startup; this keeps it bounded after
+    stop_purge = threading.Event()
+    threading.Thread(
+        target=get_run_ledger(config.STATE_DIR).purge_periodically,
+        args=(config.LEDGER_RETENTION_DAYS * 86400, config.JANITOR_INTERVAL_SECONDS, stop_purge),
+        name="ledger-purge",
+        daemon=True,
+    ).start()
+    yield
+    stop_purge.set()
+    janitor.stop()
+    claims_janitor.stop()
+    memo_janitor.stop()
+    streams_janitor.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.post("/webhook", status_code=202)
+async def webhook(request: Request, background_tasks: BackgroundTasks) -> dict:
+    config = get_settings()
+    # The SLO clock starts when the event is received, not when it is processed
+    deadline = Deadline.after(config.SLO_SECONDS)
+    event_name = request.headers.get("X-GitHub-Event", "")
+    raw_payload = await request.json()
+    delivery_id = request.headers.get("X-GitHub-Delivery") or str(uuid.uuid4())
+
+    # The SQLite write must not block the event loop; asyncio's default
+    # executor is not shared with the threadpool running event handlers.
+    await asyncio.to_thread(
+        get_run_ledger(config.STATE_DIR).received, delivery_id, event_name, raw_payload
+    )
+    get_admission_controller().enqueued()
+    background_tasks.add_task(
+        handle_event, event_name, raw_payload, config, deadline, delivery_id
+    )
+    return {"event": event_name, "status": "accepted"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> str:
+    # Served on the event loop: the threadpool may be busy with event handlers,
+    # and building the metrics only takes short in-memory locks.
+    return (
+        get_admission_controller().metrics()
+        + get_runner_pool().metrics()
+        + get_storm_clusters().metrics()
+    )
+
+
+if __name__ == "__main__":
+    from gh_payload import raw_payload
+
+    config = get_settings()
+    deadline = Deadline.after(config.SLO_SECONDS)
+    handle_event("workflow_run", raw_payload, config, deadline)
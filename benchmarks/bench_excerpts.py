@@ -0,0 +1,74 @@
+"""
+Compares peak RSS and wall time of reading log excerpts with a full ``read()``
+versus the mmap based readers used by post_pr_comment.py.
+
+python benchmarks/bench_excerpts.py --size-mb 500
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOG_LINE = "2025-07-07T11:44:40.1234567Z FAILED tests/test_app.py::test_random - AssertionError: ✗ expected 4 got 5 ü\n"
+
+STRATEGIES = {
+    "full-read": "with open(path) as f:\n    excerpt = f.read()[:chars]",
+    "read-head": "from tools.gh.excerpts import read_head\nexcerpt = read_head(path, chars)",
+    "read-tail": "from tools.gh.excerpts import read_tail\nexcerpt = read_tail(path, chars)",
+}
+
+RUNNER = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+path, chars = {path!r}, {chars}
+started = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "chars": len(excerpt),
+}}))
+"""
+
+
+def write_synthetic_log(path: str, size_mb: int) -> None:
+    chunk = (LOG_LINE * (1024 * 1024 // len(LOG_LINE.encode()))).encode()
+    target = size_mb * 1024 * 1024
+    with open(path, "wb") as f:
+        while f.tell() < target:
+            f.write(chunk[: target - f.tell()])
+
+
+def run_strategy(code: str, path: str, chars: int) -> dict:
+    script = RUNNER.format(root=ROOT, path=path, chars=chars, code=code)
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark log excerpt readers")
+    parser.add_argument("--size-mb", type=int, default=500, help="Synthetic log size")
+    parser.add_argument("--chars", type=int, default=1500, help="Excerpt length")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "failed_logs.txt")
+        write_synthetic_log(path, args.size_mb)
+
+        print(f"{'strategy':<12} {'seconds':>10} {'peak RSS MB':>12}")
+        for name, code in STRATEGIES.items():
+            stats = run_strategy(code, path, args.chars)
+            print(
+                f"{name:<12} {stats['seconds']:>10.4f} {stats['max_rss_kb'] / 1024:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Profiles peak RSS, wall time and top allocations of the tool scripts against
+local stub GitHub and Teams servers, for synthetic diffs and logs of growing size.
+
+python benchmarks/profile_tools.py --sizes 1KB,1MB,100MB,1GB --report profile.json
+python benchmarks/profile_tools.py --thresholds benchmarks/profile_thresholds.json --baseline profile.json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3}
+
+LOG_LINE = "2025-07-07T11:44:40.1234567Z FAILED tests/test_app.py::test_random - AssertionError: ✗ expected 4 got 5 ü\n"
+
+DIFF_FILE = """diff --git a/src/module_{n}.py b/src/module_{n}.py
+index 3c4355e..8f2a1b7 100644
+--- a/src/module_{n}.py
++++ b/src/module_{n}.py
+@@ -10,7 +10,8 @@ def handler(event):
+     payload = parse(event)
+-    return process(payload)
++    result = process(payload)
++    return result
+     # unchanged context line with some ünïcode ✓
+"""
+
+RUNNER = """
+import contextlib, importlib, json, os, resource, sys, threading, time, tracemalloc
+sys.path.insert(0, {root!r})
+module = importlib.import_module({module!r})
+sys.argv = {argv!r}
+trace = {trace!r}
+peak = {{"bytes": 0, "snapshot": None}}
+done = threading.Event()
+
+def sample():
+    # Snapshot whenever traced memory reaches a new high, so the top
+    # allocators are those alive at the peak rather than at exit.
+    while not done.wait(0.02):
+        current = tracemalloc.get_traced_memory()[0]
+        if current > peak["bytes"] * 1.1:
+            peak["bytes"], peak["snapshot"] = current, tracemalloc.take_snapshot()
+
+if trace:
+    tracemalloc.start()
+    threading.Thread(target=sample, daemon=True).start()
+exit_code = 0
+started = time.perf_counter()
+with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+    try:
+        module.main(**{kwargs!r})
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+elapsed = time.perf_counter() - started
+done.set()
+result = {{
+    "seconds": elapsed,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "exit_code": exit_code,
+}}
+if trace:
+    result["traced_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+    result["top_allocators"] = [
+        {{"location": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}}
+        for stat in (peak["snapshot"] or tracemalloc.take_snapshot()).statistics("lineno")[:{top}]
+    ]
+print(json.dumps(result))
+"""
+
+
+def parse_size(text: str) -> int:
+    match = re.fullmatch(r"(\d+)\s*([KMG]?B)", text.strip().upper())
+    if not match:
+        raise argparse.ArgumentTypeError(f"Invalid size: {text}")
+    return int(match.group(1)) * SIZE_UNITS[match.group(2)]
+
+
+def write_repeated(path: str, size: int, make_chunk) -> None:
+    with open(path, "wb") as f:
+        n = 0
+        while f.tell() < size:
+            chunk = make_chunk(n).encode()
+            f.write(chunk[: size - f.tell()])
+            n += 1
+
+
+class StubServer:
+    """GitHub and Teams endpoints the tools talk to, serving the synthetic diff."""
+
+    def __init__(self, diff_path: str):
+        self.diff_path = diff_path
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, body: bytes, content_type: str = "application/json") -> None:
+                self.send_response(201 if self.command == "POST" else 200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.endswith(".diff"):
+                    size = os.path.getsize(server.diff_path)
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; charset=utf-8")
+                    self.send_header("Content-Length", str(size))
+                    self.end_headers()
+                    with open(server.diff_path, "rb") as f:
+                        while chunk := f.read(1024 * 1024):
+                            self.wfile.write(chunk)
+                else:
+                    self._reply(b'{"login": "bench"}')
+
+            def do_POST(self):
+                remaining = int(self.headers.get("Content-Length", 0))
+                while remaining:
+                    remaining -= len(self.rfile.read(min(remaining, 1024 * 1024)))
+                self._reply(b'{"id": 1, "html_url": "http://stub/comment/1"}')
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+
+
+def run_case(
+    module: str,
+    argv: list[str],
+    env: dict[str, str],
+    trace: bool,
+    top: int,
+    kwargs: dict | None = None,
+) -> dict:
+    script = RUNNER.format(
+        root=ROOT, module=module, argv=argv, kwargs=kwargs or {}, trace=trace, top=top
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        env={**os.environ, **env},
+    )
+    if result.returncode != 0 or not result.stdout.strip():
+        return {"error": result.stderr.strip()[-2000:] or f"exit status {result.returncode}"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def profile_size(size: int, stub_url: str, tmp: str, trace: bool, top: int) -> list[dict]:
+    """Profile every tool on inputs of ``size`` bytes; later tools use earlier outputs."""
+    diff_path = os.path.join(tmp, "pr_diff.txt")
+    logs_path = os.path.join(tmp, "failed_logs.txt")
+    analysis_path = os.path.join(tmp, "analysis.txt")
+    write_repeated(os.path.join(tmp, "served.diff"), size, lambda n: DIFF_FILE.format(n=n))
+    write_repeated(logs_path, size, lambda n: LOG_LINE)
+    write_repeated(analysis_path, size, lambda n: "The test fails randomly. ")
+
+    env = {
+        "GH_TOKEN": "bench-token",
+        "GITHUB_API_URL": stub_url,
+        "GITHUB_SERVER_URL": stub_url,
+    }
+    cases = [
+        ("get_diff", "tools.gh.get_diff", ["get_diff.py", "owner/repo", "1", diff_path], None),
+        (
+            "post_pr_comment",
+            "tools.gh.post_pr_comment",
+            [
+                "post_pr_comment.py",
+                "--repo", "owner/repo",
+                "--number", "1",
+                "--workflow-run-id", "1",
+                "--analysis-path", analysis_path,
+                "--failed-logs-path", logs_path,
+                "--diff-path", diff_path,
+                "--failure-index", os.path.join(tmp, "failure_index.db"),
+            ],
+            None,
+        ),
+        (
+            "prepare_summary",
+            "tools.teams.prepare_summary",
+            [
+                "prepare_summary.py", "Test fails randomly", f"{stub_url}/pr",
+                "bench", f"{stub_url}/run", f"{stub_url}/comment",
+                "--diff-index", f"{os.path.splitext(diff_path)[0]}.index.json",
+            ],
+            None,
+        ),
+        (
+            "send_message",
+            "tools.teams.send_message",
+            ["send_message.py", "bench", json.dumps({"summary": "Test fails randomly"})],
+            {"pipeline_webhook_mapping": {}, "default_webhook_url": f"{stub_url}/webhook"},
+        ),
+    ]
+
+    results = []
+    for tool, module, argv, kwargs in cases:
+        result = {"tool": tool, "size_bytes": size}
+        measured = run_case(module, argv, env, trace=False, top=top, kwargs=kwargs)
+        result.update(measured)
+        if trace and "error" not in measured:
+            traced = run_case(module, argv, env, trace=True, top=top, kwargs=kwargs)
+            result["traced_peak_bytes"] = traced.get("traced_peak_bytes")
+            result["top_allocators"] = traced.get("top_allocators", [])
+        results.append(result)
+        status = result.get("error") or f"exit {result['exit_code']}"
+        print(
+            f"{tool:<16} {size:>12} {result.get('seconds', 0):>9.3f} "
+            f"{result.get('max_rss_kb', 0) / 1024:>10.1f}  {status.splitlines()[-1]}"
+        )
+    return results
+
+
+def check_regressions(
+    results: list[dict], thresholds: dict, baseline: list[dict], tolerance: float
+) -> list[str]:
+    """Violations of the per-tool limits and of the baseline report plus ``tolerance``."""
+    violations = []
+    previous = {(entry["tool"], entry["size_bytes"]): entry for entry in baseline}
+    for result in results:
+        name = f"{result['tool']} @ {result['size_bytes']} bytes"
+        if "error" in result or result.get("exit_code"):
+            violations.append(f"{name}: failed ({result.get('error', 'exit ' + str(result.get('exit_code')))})")
+            continue
+
+        rss_mb = result["max_rss_kb"] / 1024
+        limits = thresholds.get(result["tool"], {})
+        if (limit := limits.get("max_rss_mb")) is not None and rss_mb > limit:
+            violations.append(f"{name}: peak RSS {rss_mb:.1f} MB > {limit} MB")
+        if (limit := limits.get("max_seconds")) is not None and result["seconds"] > limit:
+            violations.append(f"{name}: {result['seconds']:.2f}s > {limit}s")
+
+        if (before := previous.get((result["tool"], result["size_bytes"]))) and "max_rss_kb" in before:
+            if result["max_rss_kb"] > before["max_rss_kb"] * (1 + tolerance):
+                violations.append(
+                    f"{name}: peak RSS {rss_mb:.1f} MB regressed from "
+                    f"{before['max_rss_kb'] / 1024:.1f} MB"
+                )
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile memory and time of the tool scripts")
+    parser.add_argument(
+        "--sizes",
+        type=lambda text: [parse_size(size) for size in text.split(",")],
+        default="1KB,1MB,64MB",
+        help="Comma separated diff/log sizes, e.g. 1KB,1MB,100MB,1GB",
+    )
+    parser.add_argument("--report", default="profile_report.json", help="JSON report path")
+    parser.add_argument("--top", type=int, default=10, help="Top allocators to keep per case")
+    parser.add_argument(
+        "--no-tracemalloc", action="store_true", help="Skip the tracemalloc pass"
+    )
+    parser.add_argument(
+        "--thresholds", help="JSON file with per-tool max_rss_mb / max_seconds limits"
+    )
+    parser.add_argument("--baseline", help="Earlier report to compare peak RSS against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Allowed RSS growth over the baseline"
+    )
+    args = parser.parse_args()
+
+    thresholds, baseline = {}, []
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            thresholds = json.load(f)
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    print(f"{'tool':<16} {'size bytes':>12} {'seconds':>9} {'RSS MB':>10}  status")
+    results = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            stub = StubServer(os.path.join(tmp, "served.diff"))
+            try:
+                results.extend(profile_size(size, stub.url, tmp, not args.no_tracemalloc, args.top))
+            finally:
+                stub.close()
+
+    violations = check_regressions(results, thresholds, baseline, args.tolerance)
+    with open(args.report, "w") as f:
+        json.dump({"results": results, "violations": violations}, f, indent=2)
+    print(f"Report written to {args.report}")
+
+    if violations:
+        print("\n".join(violations))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
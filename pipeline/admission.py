@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from pipeline.metrics import format_metric
+from pipeline.replay import percentile
+
+NORMAL = "normal"
+DEGRADED = "degraded"
+
+
+@dataclass(frozen=True)
+class AdmissionThresholds:
+    """High-water marks that switch to degraded mode and low-water marks that switch back."""
+
+    queue_high: int = 20
+    queue_low: int = 5
+    in_flight_high: int = 10
+    in_flight_low: int = 4
+    latency_high: float = 420.0
+    latency_low: float = 240.0
+    # Latency samples older than this no longer count, so pressure can drop
+    # while degraded runs (which skip the watched step) are all that execute.
+    latency_window: float = 600.0
+    # Minimum time in degraded mode before switching back, to avoid flapping
+    min_dwell: float = 60.0
+
+
+class AdmissionController:
+    """Chooses between the full and the degraded workflow for new events.
+
+    It watches the number of events waiting to be processed, the number of
+    workflow executions in flight and the p90 latency of ``latency_step``
+    (the agent analysis) over a recent window. Crossing any high-water mark
+    switches to degraded mode; it switches back once every signal is below
+    its low-water mark and ``min_dwell`` has passed.
+    """
+
+    def __init__(self, thresholds: AdmissionThresholds, latency_step: str = "failure-analysis"):
+        self.thresholds = thresholds
+        self.latency_step = latency_step
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.mode = NORMAL
+        self.transitions = {NORMAL: 0, DEGRADED: 0}
+        self.admitted = {NORMAL: 0, DEGRADED: 0}
+        self._latencies: deque[tuple[float, float]] = deque(maxlen=1000)
+        self._mode_since = time.monotonic()
+        self._lock = threading.Lock()
+
+    def enqueued(self) -> None:
+        with self._lock:
+            self.queue_depth += 1
+
+    def dequeued(self) -> None:
+        with self._lock:
+            self.queue_depth = max(0, self.queue_depth - 1)
+
+    def execution_started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def execution_finished(self) -> None:
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def observe_step(self, step_name: str, seconds: float) -> None:
+        if step_name != self.latency_step:
+            return
+        with self._lock:
+            self._latencies.append((time.monotonic(), seconds))
+
+    def latency_p90(self) -> float:
+        cutoff = time.monotonic() - self.thresholds.latency_window
+        with self._lock:
+            while self._latencies and self._latencies[0][0] < cutoff:
+                self._latencies.popleft()
+            samples = [seconds for _, seconds in self._latencies]
+        return percentile(samples, 90)
+
+    def admit(self) -> str:
+        """Mode the next workflow should be built in; re-evaluates the signals."""
+        latency = self.latency_p90()
+        limits = self.thresholds
+        with self._lock:
+            pressure = (
+                self.queue_depth >= limits.queue_high
+                or self.in_flight >= limits.in_flight_high
+                or latency >= limits.latency_high
+            )
+            relieved = (
+                self.queue_depth <= limits.queue_low
+                and self.in_flight <= limits.in_flight_low
+                and latency <= limits.latency_low
+            )
+            now = time.monotonic()
+            if self.mode == NORMAL and pressure:
+                self._switch(DEGRADED, now, latency)
+            elif (
+                self.mode == DEGRADED
+                and relieved
+                and now - self._mode_since >= limits.min_dwell
+            ):
+                self._switch(NORMAL, now, latency)
+            self.admitted[self.mode] += 1
+            return self.mode
+
+    def _switch(self, mode: str, now: float, latency: float) -> None:
+        print(
+            f"Admission mode {self.mode} -> {mode} (queue={self.queue_depth}, "
+            f"in_flight={self.in_flight}, latency_p90={latency:.0f}s)"
+        )
+        self.mode = mode
+        self._mode_since = now
+        self.transitions[mode] += 1
+
+    def metrics(self) -> str:
+        latency = self.latency_p90()
+        with self._lock:
+            return "".join(
+                [
+                    format_metric(
+                        "aels_admission_degraded",
+                        "gauge",
+                        "1 while new events get the degraded workflow",
+                        [({}, int(self.mode == DEGRADED))],
+                    ),
+                    format_metric(
+                        "aels_admission_transitions_total",
+                        "counter",
+                        "Admission mode switches by the mode switched to",
+                        [({"mode": mode}, count) for mode, count in self.transitions.items()],
+                    ),
+                    format_metric(
+                        "aels_admitted_events_total",
+                        "counter",
+                        "Events admitted by workflow mode",
+                        [({"mode": mode}, count) for mode, count in self.admitted.items()],
+                    ),
+                    format_metric(
+                        "aels_queue_depth",
+                        "gauge",
+                        "Events accepted but not yet processed",
+                        [({}, self.queue_depth)],
+                    ),
+                    format_metric(
+                        "aels_in_flight_executions",
+                        "gauge",
+                        "Workflow executions in progress",
+                        [({}, self.in_flight)],
+                    ),
+                    format_metric(
+                        "aels_step_latency_p90_seconds",
+                        "gauge",
+                        "p90 latency of the watched step over the recent window",
+                        [({"step": self.latency_step}, latency)],
+                    ),
+                ]
+            )
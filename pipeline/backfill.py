@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from app import get_run_ledger, get_settings, handle_workflow_run
+from pipeline.deadlines import Deadline
+
+API_URL = "https://api.github.com"
+
+# Below this many remaining API requests, wait for the rate limit window to reset.
+RATE_LIMIT_RESERVE = 50
+
+
+class BackfillState:
+    """Resumable position of a repository's backfill.
+
+    ``next_url`` is the page of failed runs to continue from; ``analyzed``
+    holds ``run_id-attempt`` keys that went through the pipeline, or that
+    the service already handled, so a rerun (or a resumed backfill) skips them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            state = {}
+        self.next_url: str | None = state.get("next_url")
+        self.analyzed: set[str] = set(state.get("analyzed", []))
+
+    @staticmethod
+    def key(run: dict) -> str:
+        return f"{run['id']}-{run.get('run_attempt', 1)}"
+
+    def mark_analyzed(self, run: dict) -> None:
+        with self._lock:
+            self.analyzed.add(self.key(run))
+            self._save()
+
+    def advance(self, next_url: str | None) -> None:
+        with self._lock:
+            self.next_url = next_url
+            self._save()
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"next_url": self.next_url, "analyzed": sorted(self.analyzed)}, f)
+        os.replace(tmp_path, self.path)
+
+
+def github_get(
+    session: requests.Session, url: str, params: dict | None = None
+) -> requests.Response:
+    """GET that waits out GitHub's primary and secondary rate limits."""
+    while True:
+        response = session.get(url, params=params, timeout=30)
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        limited = response.status_code in (403, 429) and (
+            remaining == "0" or "Retry-After" in response.headers
+        )
+        if limited or (remaining is not None and int(remaining) < RATE_LIMIT_RESERVE):
+            if retry_after := response.headers.get("Retry-After"):
+                wait = float(retry_after)
+            else:
+                reset_at = float(response.headers.get("X-RateLimit-Reset", time.time() + 60))
+                wait = max(1.0, reset_at - time.time())
+            print(f"GitHub rate limit reached, waiting {wait:.0f}s")
+            time.sleep(wait)
+            if limited:
+                continue
+
+        response.raise_for_status()
+        return response
+
+
+def failed_run_pages(
+    session: requests.Session,
+    repository: str,
+    start_url: str | None = None,
+    workflow: str | None = None,
+):
+    """Yield ``(runs, next_url)`` for each page of failed workflow runs, newest first."""
+    if start_url:
+        url, params = start_url, None
+    else:
+        url = f"{API_URL}/repos/{repository}/actions/runs"
+        params = {"status": "failure", "per_page": 100}
+        if workflow:
+            url = f"{API_URL}/repos/{repository}/actions/workflows/{workflow}/runs"
+
+    while url:
+        response = github_get(session, url, params)
+        next_url = response.links.get("next", {}).get("url")
+        yield response.json().get("workflow_runs", []), next_url
+        url, params = next_url, None  # The next link already carries the query
+
+
+def synthesize_payload(run: dict) -> dict:
+    """A ``workflow_run`` webhook payload for a run from the list API."""
+    return {"action": "completed", "workflow_run": run, "repository": run["repository"]}
+
+
+def backfill(
+    repository: str,
+    limit: int,
+    concurrency: int,
+    workflow: str | None = None,
+) -> int:
+    """Analyze up to ``limit`` failed PR runs of ``repository``; returns the number analyzed."""
+    config = get_settings()
+    state = BackfillState(
+        f"{config.STATE_DIR}/backfill/{repository.replace('/', '__')}.json"
+    )
+    session = requests.Session()
+    session.headers.update(
+        {
+            "Authorization": f"Bearer {config.GH_TOKEN}",
+            "Accept": "application/vnd.github+json",
+        }
+    )
+
+    ledger = get_run_ledger(config.STATE_DIR)
+
+    def analyze(run: dict) -> bool:
+        # Runs the service got a webhook for already have (or will get) a comment
+        if ledger.handled_run(repository, run["id"], run.get("run_attempt", 1)):
+            print(f"⏭️ Run {run['id']} already handled by the service")
+            state.mark_analyzed(run)
+            return False
+        try:
+            # Storm followers finish on the clusters' pool
+            if deferred := handle_workflow_run(
+                synthesize_payload(run), config, Deadline.after(config.SLO_SECONDS)
+            ):
+                deferred.result()
+        except Exception as e:
+            print(f"❌ Run {run['id']} failed: {e}")
+            return False
+        state.mark_analyzed(run)
+        print(f"✅ Run {run['id']} analyzed")
+        return True
+
+    analyzed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for runs, next_url in failed_run_pages(session, repository, state.next_url, workflow):
+            candidates = [
+                run
+                for run in runs
+                if run.get("conclusion") == "failure"
+                and run.get("pull_requests")
+                and BackfillState.key(run) not in state.analyzed
+            ][: limit - analyzed]
+            analyzed += sum(pool.map(analyze, candidates))
+            if analyzed >= limit:
+                break
+            # Only move the cursor once the whole page went through, so an
+            # interrupted backfill resumes from the first unfinished page.
+            state.advance(next_url)
+    return analyzed
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(
+        description="Analyze the past failed PR workflow runs of a repository"
+    )
+    parser.add_argument("repo", help="Repository in format owner/repo")
+    parser.add_argument("--limit", type=int, default=50, help="Number of failed runs to analyze")
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Runs analyzed in parallel"
+    )
+    parser.add_argument("--workflow", help="Workflow file name or id to restrict the backfill to")
+    args = parser.parse_args()
+
+    analyzed = backfill(args.repo, args.limit, args.concurrency, args.workflow)
+    print(f"Backfill finished: {analyzed} runs analyzed")
+
+
+if __name__ == "__main__":
+    main()
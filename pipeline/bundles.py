@@ -0,0 +1,103 @@
+import argparse
+import base64
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+from dataclasses import dataclass
+from functools import lru_cache
+
+TOOLS_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools")
+# Tool packages shipped to the runners, each unpacked into its own directory
+BUNDLE_PACKAGES = ("gh", "teams")
+BUNDLES_DIR = "/shared/bundles"
+
+
+@dataclass(frozen=True)
+class ToolBundle:
+    """The tool scripts as one gzipped tarball, addressed by its sha256 digest."""
+
+    digest: str
+    archive: bytes
+
+    @property
+    def root(self) -> str:
+        return f"{BUNDLES_DIR}/{self.digest}"
+
+    def script(self, package: str, name: str) -> str:
+        """Path of a tool script once the bundle is installed on the shared volume."""
+        return f"{self.root}/{package}/{name}"
+
+    def encoded(self) -> str:
+        return base64.b64encode(self.archive).decode()
+
+
+def build_bundle(root: str = TOOLS_ROOT, packages: tuple[str, ...] = BUNDLE_PACKAGES) -> ToolBundle:
+    """Pack the ``.py`` files of ``packages`` below ``root``.
+
+    File order, ownership and timestamps are fixed so the same sources
+    always produce the same archive, and therefore the same digest.
+    """
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as compressed:
+        with tarfile.open(fileobj=compressed, mode="w") as tar:
+            for package in packages:
+                for name in sorted(os.listdir(os.path.join(root, package))):
+                    if not name.endswith(".py"):
+                        continue
+                    with open(os.path.join(root, package, name), "rb") as f:
+                        content = f.read()
+                    info = tarfile.TarInfo(f"{package}/{name}")
+                    info.size = len(content)
+                    info.mode = 0o644
+                    tar.addfile(info, io.BytesIO(content))
+
+    archive = buffer.getvalue()
+    return ToolBundle(hashlib.sha256(archive).hexdigest(), archive)
+
+
+@lru_cache
+def get_bundle() -> ToolBundle:
+    return build_bundle()
+
+
+def install(bundle: ToolBundle, bundles_dir: str) -> str:
+    """Unpack ``bundle`` below ``bundles_dir`` unless it is there already."""
+    target = os.path.join(bundles_dir, bundle.digest)
+    if os.path.isdir(target):
+        return target
+
+    os.makedirs(bundles_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f"{bundle.digest}.", dir=bundles_dir)
+    os.chmod(staging, 0o755)
+    with tarfile.open(fileobj=io.BytesIO(bundle.archive), mode="r:gz") as tar:
+        tar.extractall(staging, filter="data")
+    try:
+        os.rename(staging, target)
+    except OSError:
+        # Installed concurrently by another process
+        shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(
+        description="Build the tool bundle and optionally install it on a runner's shared volume"
+    )
+    parser.add_argument(
+        "--install-dir", help="Bundles directory to unpack into (e.g. /shared/bundles)"
+    )
+    args = parser.parse_args()
+
+    bundle = get_bundle()
+    print(f"Tool bundle {bundle.digest} ({len(bundle.archive)} bytes)")
+    if args.install_dir:
+        print(f"Installed at {install(bundle, args.install_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import hashlib
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from pipeline.metrics import format_metric
+from tools.gh.failure_index import LOG_TAIL_CHARS, excerpt_tokens, normalize_excerpt
+
+
+def fingerprint(logs: str) -> str | None:
+    """Digest of the normalized error lines of failed logs.
+
+    None if nothing but runner boilerplate is left, which would put
+    unrelated failures in one cluster.
+    """
+    excerpt = normalize_excerpt(logs[-LOG_TAIL_CHARS:])
+    if not excerpt_tokens(excerpt):
+        return None
+    return hashlib.sha256(excerpt.encode()).hexdigest()[:16]
+
+
+@dataclass
+class Cluster:
+    """Failures with the same fingerprint; the first one to join leads the analysis."""
+
+    fingerprint: str
+    leader: tuple
+    leader_ref: str
+    created_at: float
+    members: set = field(default_factory=set)
+    analysis: str | None = None
+    done: bool = False
+    _callbacks: list = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def is_leader(self, member: tuple) -> bool:
+        return member == self.leader
+
+    def resolve(self, analysis: str | None) -> None:
+        """Publish the leader's analysis, or None if it failed; only the first call counts."""
+        with self._lock:
+            if self.done:
+                return
+            self.analysis, self.done = analysis, True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(analysis)
+
+    def add_done_callback(self, callback: Callable[[str | None], None]) -> None:
+        """Call ``callback`` with the analysis once resolved (right away if it is)."""
+        with self._lock:
+            if not self.done:
+                self._callbacks.append(callback)
+                return
+        callback(self.analysis)
+
+
+class StormClusters:
+    """Groups in-flight failures by log fingerprint so one analysis serves many.
+
+    A failure whose fingerprint matches a cluster created less than
+    ``window_seconds`` ago joins it as a follower; otherwise it starts a
+    new cluster and leads it. Members are keyed by ``(repo, run_id,
+    run_attempt)`` and keep their cluster for ``retention_seconds``, so the
+    ``workflow_job`` and ``workflow_run`` events of one attempt get the
+    same role. Clusters live in this process only.
+
+    Followers do not hold a thread while their leader analyzes: ``follow``
+    runs them on a pool of ``max_workers`` once the analysis is in.
+    """
+
+    def __init__(self, window_seconds: float, retention_seconds: float, max_workers: int = 8):
+        self.window_seconds = window_seconds
+        self.retention_seconds = retention_seconds
+        self.shared = 0
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="storm-follower")
+        self._open: dict[str, Cluster] = {}
+        self._by_member: dict[tuple, Cluster] = {}
+        self._lock = threading.Lock()
+
+    def _purge(self, now: float) -> None:
+        cutoff = now - self.window_seconds - self.retention_seconds
+        self._open = {
+            key: cluster for key, cluster in self._open.items() if cluster.created_at >= cutoff
+        }
+        self._by_member = {
+            member: cluster
+            for member, cluster in self._by_member.items()
+            if cluster.created_at >= cutoff
+        }
+
+    def join(self, fingerprint: str, member: tuple, member_ref: str) -> Cluster:
+        """The cluster of ``member``; ``member_ref`` names it in followers' comments."""
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            if cluster := self._by_member.get(member):
+                return cluster
+
+            cluster = self._open.get(fingerprint)
+            if cluster is None or now - cluster.created_at > self.window_seconds:
+                cluster = Cluster(fingerprint, member, member_ref, now)
+                self._open[fingerprint] = cluster
+            cluster.members.add(member)
+            self._by_member[member] = cluster
+            return cluster
+
+    def follow(
+        self, cluster: Cluster, timeout: float, run: Callable[[str | None], None]
+    ) -> Future:
+        """Run a follower with its leader's analysis; the future finishes with ``run``.
+
+        ``run`` gets the analysis introduced for the follower's comment, or
+        None if the leader ended without one or took over ``timeout`` seconds.
+        """
+        future = Future()
+        once = threading.Lock()
+
+        def execute(analysis: str | None) -> None:
+            try:
+                run(analysis)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(None)
+
+        def start(analysis: str | None) -> None:
+            if not once.acquire(blocking=False):
+                return
+            timer.cancel()
+            if analysis:
+                with self._lock:
+                    self.shared += 1
+                analysis = (
+                    f"_This failure matches the one analyzed for {cluster.leader_ref}; "
+                    f"the analysis below is shared by every PR it hit._\n\n{analysis}"
+                )
+            self._executor.submit(execute, analysis)
+
+        timer = threading.Timer(max(0.0, timeout), start, args=(None,))
+        timer.daemon = True
+        timer.start()
+        cluster.add_done_callback(start)
+        return future
+
+    def metrics(self) -> str:
+        now = time.monotonic()
+        with self._lock:
+            open_clusters = [
+                cluster
+                for cluster in self._open.values()
+                if now - cluster.created_at <= self.window_seconds
+            ]
+            return "".join(
+                [
+                    format_metric(
+                        "aels_storm_clusters_open",
+                        "gauge",
+                        "Failure clusters still accepting members",
+                        [({}, len(open_clusters))],
+                    ),
+                    format_metric(
+                        "aels_storm_cluster_members",
+                        "gauge",
+                        "Largest number of failures in an open cluster",
+                        [({}, max((len(c.members) for c in open_clusters), default=0))],
+                    ),
+                    format_metric(
+                        "aels_storm_shared_analyses_total",
+                        "counter",
+                        "Failures that reused their cluster leader's analysis",
+                        [({}, self.shared)],
+                    ),
+                ]
+            )
@@ -0,0 +1,280 @@
+import argparse
+import json
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+
+from pipeline import stream_events
+from pipeline.replay import percentile
+
+PERCENTILES = (("p50", 50), ("p90", 90), ("p99", 99))
+
+
+@dataclass
+class CriticalPath:
+    path: list[str]
+    length: float
+    serial_length: float
+    slack: dict[str, float]
+
+    @property
+    def speedup(self) -> float:
+        """Speedup of running independent steps in parallel over running them one by one."""
+        return self.serial_length / self.length if self.length else 1.0
+
+
+def load_graph(workflow_definition: dict) -> dict[str, list[str]]:
+    """``{step name: names it depends on}`` of a ``model_dump`` definition."""
+    graph = {}
+    for step in workflow_definition.get("steps", []):
+        depends = step.get("depends") or []
+        graph[step["name"]] = [depends] if isinstance(depends, str) else list(depends)
+    return graph
+
+
+def step_durations(records: list) -> dict[str, float]:
+    """Per-step durations in seconds from a recorded execution stream.
+
+    Records are ``{"received_at": epoch, "line": ...}`` as written by the
+    service, or bare stream items. A duration reported by the runner in the
+    ``step_finished`` event wins over the time between the step's
+    ``step_running`` and ``step_finished`` events.
+    """
+    started, durations = {}, {}
+    for record in records:
+        received_at = record.get("received_at") if isinstance(record, dict) else None
+        line = record.get("line", record) if isinstance(record, dict) else record
+        if not (event := stream_events.parse_event(line)):
+            continue
+        if name := stream_events.step_started(event):
+            if received_at is not None:
+                started[name] = received_at
+        elif finished := stream_events.step_finished(event):
+            name = finished[0]
+            step = event.get("step") or {}
+            reported = step.get("duration_sec", step.get("duration"))
+            if isinstance(reported, (int, float)):
+                durations[name] = float(reported)
+            elif received_at is not None and name in started:
+                durations[name] = received_at - started[name]
+    return durations
+
+
+def load_stream(path: str) -> list:
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                records.append(line)
+    return records
+
+
+def critical_path(
+    graph: dict[str, list[str]],
+    durations: dict[str, float],
+    default_duration: float = 0.0,
+) -> CriticalPath:
+    """Critical path method over the ``depends`` graph.
+
+    Steps without a recorded duration take ``default_duration``. Slack is how
+    much a step could be delayed without delaying the whole run.
+    """
+    duration = {name: durations.get(name, default_duration) for name in graph}
+    order = _topological_order(graph)
+
+    earliest_finish = {}
+    for name in order:
+        start = max((earliest_finish[dependency] for dependency in graph[name]), default=0.0)
+        earliest_finish[name] = start + duration[name]
+    length = max(earliest_finish.values(), default=0.0)
+
+    dependents = defaultdict(list)
+    for name, dependencies in graph.items():
+        for dependency in dependencies:
+            dependents[dependency].append(name)
+    latest_finish = {}
+    for name in reversed(order):
+        latest_finish[name] = min(
+            (latest_finish[dependent] - duration[dependent] for dependent in dependents[name]),
+            default=length,
+        )
+    slack = {name: latest_finish[name] - earliest_finish[name] for name in order}
+
+    path = []
+    if order:
+        current = max(order, key=lambda name: earliest_finish[name])
+        while current is not None:
+            path.append(current)
+            start = earliest_finish[current] - duration[current]
+            current = next(
+                (
+                    dependency
+                    for dependency in graph[current]
+                    if abs(earliest_finish[dependency] - start) < 1e-9
+                ),
+                None,
+            )
+        path.reverse()
+
+    return CriticalPath(
+        path=path,
+        length=length,
+        serial_length=sum(duration.values()),
+        slack=slack,
+    )
+
+
+def _topological_order(graph: dict[str, list[str]]) -> list[str]:
+    order, done, visiting = [], set(), set()
+
+    def visit(name: str) -> None:
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle through step {name}")
+        visiting.add(name)
+        for dependency in graph[name]:
+            if dependency not in graph:
+                raise ValueError(f"Step {name} depends on unknown step {dependency}")
+            visit(dependency)
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+
+    for name in graph:
+        visit(name)
+    return order
+
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    return {name: round(percentile(values, pct), 3) for name, pct in PERCENTILES}
+
+
+def aggregate(graph: dict[str, list[str]], runs: list[dict[str, float]]) -> dict:
+    """Percentiles of the critical path, per-step durations and slack across runs."""
+    results = [critical_path(graph, durations) for durations in runs]
+    on_path = defaultdict(int)
+    for result in results:
+        for name in result.path:
+            on_path[name] += 1
+
+    return {
+        "runs": len(results),
+        "critical_path_seconds": _percentiles([result.length for result in results]),
+        "serial_seconds": _percentiles([result.serial_length for result in results]),
+        "speedup": _percentiles([result.speedup for result in results]),
+        "steps": {
+            name: {
+                "duration_seconds": _percentiles(
+                    [durations[name] for durations in runs if name in durations]
+                ),
+                "slack_seconds": _percentiles([result.slack[name] for result in results]),
+                "on_critical_path": round(on_path[name] / len(results), 3) if results else 0.0,
+            }
+            for name in graph
+        },
+    }
+
+
+def compare(
+    baseline_graph: dict[str, list[str]],
+    graph: dict[str, list[str]],
+    runs: list[dict[str, float]],
+    threshold: float,
+) -> dict:
+    """Critical path of two definitions under the same recorded step durations.
+
+    Each percentile of the step durations is fed through both graphs; the
+    candidate regresses when its critical path is more than ``threshold``
+    (a fraction) longer than the baseline's at any percentile.
+    """
+    comparison = {"regressions": []}
+    for name, pct in PERCENTILES:
+        durations = {
+            step: percentile([run[step] for run in runs if step in run], pct)
+            for step in set(baseline_graph) | set(graph)
+            if any(step in run for run in runs)
+        }
+        baseline = critical_path(baseline_graph, durations)
+        candidate = critical_path(graph, durations)
+        comparison[name] = {
+            "baseline_seconds": round(baseline.length, 3),
+            "candidate_seconds": round(candidate.length, 3),
+            "baseline_path": baseline.path,
+            "candidate_path": candidate.path,
+        }
+        if candidate.length > baseline.length * (1 + threshold):
+            comparison["regressions"].append(name)
+    return comparison
+
+
+def format_report(graph: dict[str, list[str]], report: dict) -> str:
+    lines = [
+        f"Runs: {report['runs']}",
+        f"Critical path (s): {report['critical_path_seconds']}",
+        f"Serial (s): {report['serial_seconds']}",
+        f"Speedup from parallelism: {report['speedup']}",
+        "",
+        f"{'step':<28} {'p50 s':>8} {'p90 s':>8} {'slack p50':>10} {'critical':>9}",
+    ]
+    for name in graph:
+        step = report["steps"][name]
+        lines.append(
+            f"{name:<28} {step['duration_seconds']['p50']:>8} {step['duration_seconds']['p90']:>8} "
+            f"{step['slack_seconds']['p50']:>10} {step['on_critical_path']:>9.0%}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(
+        description="Critical path, slack and speedup of a workflow from recorded runs"
+    )
+    parser.add_argument("definition", help="Workflow definition JSON (model_dump)")
+    parser.add_argument("streams", nargs="+", help="Recorded execution stream JSONL files")
+    parser.add_argument(
+        "--baseline", help="Definition to compare against; exits 1 on a regression"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.05,
+        help="Critical path growth over the baseline flagged as a regression (fraction)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    with open(args.definition) as f:
+        graph = load_graph(json.load(f))
+    runs = [step_durations(load_stream(path)) for path in args.streams]
+
+    report = aggregate(graph, runs)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline_graph = load_graph(json.load(f))
+        report["comparison"] = compare(baseline_graph, graph, runs, args.threshold)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(graph, report))
+        if comparison := report.get("comparison"):
+            for name, _ in PERCENTILES:
+                print(
+                    f"{name}: baseline {comparison[name]['baseline_seconds']}s, "
+                    f"candidate {comparison[name]['candidate_seconds']}s"
+                )
+
+    if report.get("comparison", {}).get("regressions"):
+        print(f"Critical path regressed at {', '.join(report['comparison']['regressions'])}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
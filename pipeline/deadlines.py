@@ -0,0 +1,58 @@
+import time
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Deadline:
+    """End-to-end SLO deadline of a single webhook event (epoch seconds)."""
+
+    expires_at: float
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(expires_at=time.time() + seconds)
+
+    def remaining(self) -> float:
+        return self.expires_at - time.time()
+
+    def budget(self, cap: int, start: int = 0, reserve: int = 0, floor: int = 1) -> int:
+        """Whole seconds a step may take: its own ``cap``, shrunk to what is
+        left of the deadline after ``start`` seconds of earlier steps and
+        ``reserve`` seconds for later steps."""
+        return max(floor, min(cap, int(self.remaining()) - start - reserve))
+
+    def plan(
+        self,
+        steps: list[tuple[str, list[str]]],
+        caps: dict[str, int],
+        protected: tuple[str, ...] = (),
+        exempt: tuple[str, ...] = (),
+    ) -> dict[str, int]:
+        """Budgets for ``(name, depends)`` steps given in dependency order.
+
+        A step starts at the latest worst-case finish of its dependencies
+        and leaves room for the ``protected`` steps after it, so the budgets
+        along any path add up to what is left of the deadline (give or take
+        the one-second floor of steps that are out of time). ``exempt``
+        steps are outside the deadline, e.g. notifications following the
+        result it covers, and always get their cap.
+        """
+        downstream: dict[str, set[str]] = {name: set() for name, _ in steps}
+        for name, depends in reversed(steps):
+            for dependency in depends:
+                if dependency in downstream:
+                    downstream[dependency] |= {name} | downstream[name]
+
+        budgets: dict[str, int] = {}
+        finish: dict[str, int] = {}
+        for name, depends in steps:
+            start = max(
+                (finish[dependency] for dependency in depends if dependency in finish), default=0
+            )
+            reserve = sum(caps[later] for later in downstream[name] if later in protected)
+            if name in exempt:
+                budgets[name] = caps[name]
+            else:
+                budgets[name] = self.budget(caps[name], start=start, reserve=reserve)
+            finish[name] = start + budgets[name]
+        return budgets
@@ -0,0 +1,232 @@
+import os
+import re
+import sqlite3
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from contextlib import closing
+from dataclasses import dataclass
+
+import requests
+
+from tools.gh.failure_index import LOG_TAIL_CHARS
+from tools.gh.get_failed_logs import API_URL, list_failed_jobs
+from tools.gh.timeouts import request_timeout
+
+FAILED = "failed"
+PASSED = "passed"
+
+# Bytes from the end of each failed job's log read by the service. Test
+# summaries and the final errors are at the end, and the workflow fetches
+# the full logs itself, so this bounds the service's traffic and memory
+# whatever the size of the logs.
+LOG_SCAN_BYTES = 1024 * 1024
+
+# Failed test ids as reported by common runners: pytest's short summary,
+# ``go test`` and jest/vitest.
+_FAILED_TEST_PATTERNS = [
+    re.compile(r"(?:^|\s)(?:FAILED|ERROR) (\S+::\S+)"),
+    re.compile(r"--- FAIL: (\S+)"),
+    re.compile(r"(?:^|\s)[✕×] (.+?)(?: \(\d+ ?m?s\))?$"),
+]
+
+
+def _failed_test(line: str) -> str | None:
+    for pattern in _FAILED_TEST_PATTERNS:
+        if match := pattern.search(line):
+            return match.group(1).strip()
+    return None
+
+
+def parse_failed_tests(logs: str) -> set[str]:
+    return {test for line in logs.splitlines() if (test := _failed_test(line))}
+
+
+@dataclass
+class FailedLogs:
+    tests: set[str]
+    # Last characters of the scanned logs, enough for a failure fingerprint
+    tail: str
+
+
+def _log_lines(
+    access_token: str, repository: str, job_id: int, deadline: float | None, max_bytes: int
+) -> Iterator[str]:
+    """Lines of the last ``max_bytes`` of a job's logs, streamed."""
+    with requests.get(
+        f"{API_URL}/repos/{repository}/actions/jobs/{job_id}/logs",
+        headers={
+            "Authorization": f"Bearer {access_token}",
+            "Accept": "application/vnd.github+json",
+            "Range": f"bytes=-{max_bytes}",
+        },
+        stream=True,
+        timeout=request_timeout(deadline, cap=120),
+    ) as response:
+        response.raise_for_status()
+        lines = response.iter_lines()
+        # A partial response starts in the middle of a line; a full one
+        # (the range was ignored) is streamed through in its entirety.
+        if response.status_code == 206:
+            next(lines, None)
+        for line in lines:
+            yield line.decode("utf-8", errors="replace")
+
+
+def scan_failed_logs(
+    access_token: str,
+    repository: str,
+    run_id: int,
+    run_attempt: int,
+    job_id: int | None = None,
+    deadline: float | None = None,
+    max_bytes: int = LOG_SCAN_BYTES,
+) -> FailedLogs:
+    """Failed tests and log tail of the failed jobs (or just ``job_id``) of a run attempt.
+
+    Only the end of each job's log is requested, and it is scanned line by
+    line without being held in memory.
+    """
+    if job_id:
+        job_ids = [job_id]
+    else:
+        jobs = list_failed_jobs(access_token, repository, run_id, run_attempt, deadline)
+        job_ids = [job["id"] for job in jobs]
+
+    tests = set()
+    tail: deque[str] = deque()
+    tail_chars = 0
+    for failed_job_id in job_ids:
+        for line in _log_lines(access_token, repository, failed_job_id, deadline, max_bytes):
+            if test := _failed_test(line):
+                tests.add(test)
+            tail.append(line)
+            tail_chars += len(line) + 1
+            while tail_chars - len(tail[0]) - 1 >= LOG_TAIL_CHARS:
+                tail_chars -= len(tail.popleft()) + 1
+    return FailedLogs(tests, "\n".join(tail))
+
+
+class FlakyTracker:
+    """Test outcomes per ``(repo, workflow, test id, head_sha, run_attempt)``.
+
+    A test flips when its outcome changes between attempts of the same
+    workflow at the same ``head_sha``: the code did not change, so the test
+    is not deterministic. Attempts of other workflows at that commit run
+    other jobs and say nothing about it.
+    The flip rate is the share of consecutive attempt pairs that flipped,
+    over the outcomes recorded within the sliding window. A test compared
+    across fewer than ``min_transitions`` pairs has too little history to
+    call flaky, whatever its rate.
+    """
+
+    def __init__(
+        self, path: str, window_seconds: float, threshold: float, min_transitions: int = 3
+    ):
+        self.path = path
+        self.window_seconds = window_seconds
+        self.threshold = threshold
+        self.min_transitions = min_transitions
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as connection, connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(outcomes)")}
+            if columns and "workflow" not in columns:
+                # Outcomes recorded without their workflow cannot be told apart
+                connection.execute("DROP TABLE outcomes")
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS outcomes (
+                    repo TEXT NOT NULL,
+                    workflow TEXT NOT NULL,
+                    test_id TEXT NOT NULL,
+                    head_sha TEXT NOT NULL,
+                    run_attempt INTEGER NOT NULL,
+                    outcome TEXT NOT NULL,
+                    recorded_at REAL NOT NULL,
+                    PRIMARY KEY (repo, workflow, test_id, head_sha, run_attempt)
+                )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per call keeps the tracker safe to share between the
+        # background tasks of the webhook server.
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record_attempt(
+        self,
+        repo: str,
+        workflow: str,
+        head_sha: str,
+        run_attempt: int,
+        failed_tests: Iterable[str],
+    ) -> None:
+        """Record the failed tests of an attempt of ``workflow``.
+
+        Tests that failed in an earlier attempt of it at the same ``head_sha``
+        and are not among ``failed_tests`` passed this time. Pass an empty
+        ``failed_tests`` for a successful attempt.
+        """
+        failed_tests = set(failed_tests)
+        now = time.time()
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "DELETE FROM outcomes WHERE recorded_at < ?", (now - self.window_seconds,)
+            )
+            earlier = {
+                test_id
+                for (test_id,) in connection.execute(
+                    """SELECT DISTINCT test_id FROM outcomes
+                    WHERE repo = ? AND workflow = ? AND head_sha = ? AND run_attempt < ?
+                    AND outcome = ?""",
+                    (repo, workflow, head_sha, run_attempt, FAILED),
+                )
+            }
+            connection.executemany(
+                "INSERT OR REPLACE INTO outcomes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (repo, workflow, test_id, head_sha, run_attempt, FAILED, now)
+                    for test_id in failed_tests
+                ]
+                + [
+                    (repo, workflow, test_id, head_sha, run_attempt, PASSED, now)
+                    for test_id in earlier - failed_tests
+                ],
+            )
+
+    def flip_rate(self, repo: str, workflow: str, test_id: str) -> float:
+        flips, transitions = self._flips(repo, workflow, test_id)
+        return flips / transitions if transitions else 0.0
+
+    def _flips(self, repo: str, workflow: str, test_id: str) -> tuple[int, int]:
+        """``(flips, transitions)`` between consecutive attempts at the same commit."""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                """SELECT head_sha, outcome FROM outcomes
+                WHERE repo = ? AND workflow = ? AND test_id = ? AND recorded_at >= ?
+                ORDER BY head_sha, run_attempt""",
+                (repo, workflow, test_id, time.time() - self.window_seconds),
+            ).fetchall()
+
+        transitions = flips = 0
+        for (previous_sha, previous), (head_sha, outcome) in zip(rows, rows[1:]):
+            if head_sha != previous_sha:
+                continue
+            transitions += 1
+            flips += outcome != previous
+        return flips, transitions
+
+    def known_flaky(
+        self, repo: str, workflow: str, failed_tests: Iterable[str]
+    ) -> dict[str, float]:
+        """Flip rates of ``failed_tests`` if every one of them is above the threshold.
+
+        Empty when any failed test looks like a genuine failure, or has too
+        little history to tell, since one real failure is worth a full analysis.
+        """
+        rates = {}
+        for test_id in failed_tests:
+            flips, transitions = self._flips(repo, workflow, test_id)
+            if transitions < self.min_transitions or flips / transitions < self.threshold:
+                return {}
+            rates[test_id] = flips / transitions
+        return rates
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections.abc import Callable
+
+import requests
+
+
+def fetch_integration(host: str, api_key: str, name: str) -> str:
+    """Raw body of a Kubiya integration, as the ``KubiyaExecutorConfig`` step returned it."""
+    response = requests.get(
+        f"{host.rstrip('/')}/api/v2/integrations/{name}",
+        headers={"Authorization": f"UserKey {api_key}"},
+        timeout=30,
+    )
+    response.raise_for_status()
+    return response.text
+
+
+class IntegrationCache:
+    """TTL cache of integration lookups with refresh ahead of expiry.
+
+    A value older than ``refresh_after`` is still served while a background
+    thread refetches it, so requests only wait on a lookup for a cold or
+    expired entry. If a refresh fails the last value is kept until it is
+    ``ttl`` old; past that the failure is raised to the caller.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], str],
+        ttl: float,
+        refresh_after: float | None = None,
+    ):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.refresh_after = refresh_after if refresh_after is not None else ttl / 2
+        self._entries: dict[str, tuple[float, str]] = {}
+        self._refreshing: set[str] = set()
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> str:
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            return self._load(name)
+
+        if time.monotonic() - entry[0] >= self.refresh_after:
+            self._refresh_in_background(name)
+        return entry[1]
+
+    def _load(self, name: str) -> str:
+        value = self.fetch(name)
+        with self._lock:
+            self._entries[name] = (time.monotonic(), value)
+        return value
+
+    def _refresh_in_background(self, name: str) -> None:
+        with self._lock:
+            if name in self._refreshing:
+                return
+            self._refreshing.add(name)
+
+        def refresh() -> None:
+            try:
+                self._load(name)
+            except requests.RequestException as e:
+                print(f"Refreshing integration {name} failed, serving cached value: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(name)
+
+        threading.Thread(target=refresh, name=f"refresh-{name}", daemon=True).start()
@@ -0,0 +1,138 @@
+import argparse
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class Artifact:
+    path: str
+    size: int
+    modified_at: float
+
+
+def scan(directory: str) -> list[Artifact]:
+    """Entries of ``directory`` with their total size and latest modification time."""
+    artifacts = []
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return []
+
+    for entry in entries:
+        size, modified_at = 0, 0.0
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                for root, _, files in os.walk(entry.path):
+                    modified_at = max(modified_at, os.stat(root).st_mtime)
+                    for name in files:
+                        stat = os.stat(os.path.join(root, name), follow_symlinks=False)
+                        size += stat.st_size
+                        modified_at = max(modified_at, stat.st_mtime)
+            else:
+                stat = entry.stat(follow_symlinks=False)
+                size, modified_at = stat.st_size, stat.st_mtime
+        except FileNotFoundError:
+            continue  # Removed while scanning
+        artifacts.append(Artifact(entry.path, size, modified_at))
+    return artifacts
+
+
+def remove(path: str) -> None:
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class Janitor:
+    """Deletes the entries of a directory (e.g. per-run artifacts) by age and size quota.
+
+    Entries untouched for ``max_age`` seconds are removed; then, while the
+    directory is over ``max_total_bytes``, the least recently modified ones
+    go (without a quota only age counts). Entries modified within
+    ``min_idle`` seconds belong to runs that may still be executing and are
+    never removed.
+    """
+
+    def __init__(
+        self, directory: str, max_age: float, max_total_bytes: int | None, min_idle: float
+    ):
+        self.directory = directory
+        self.max_age = max_age
+        self.max_total_bytes = max_total_bytes
+        self.min_idle = min_idle
+        self._stop = threading.Event()
+
+    def sweep(self) -> list[str]:
+        """Run one cleanup pass; returns the removed paths."""
+        now = time.time()
+        artifacts = sorted(scan(self.directory), key=lambda artifact: artifact.modified_at)
+        total = sum(artifact.size for artifact in artifacts)
+        removed = []
+        for artifact in artifacts:
+            if now - artifact.modified_at < self.min_idle:
+                break  # Sorted oldest first, so the rest are active too
+            over_quota = self.max_total_bytes is not None and total > self.max_total_bytes
+            if now - artifact.modified_at > self.max_age or over_quota:
+                remove(artifact.path)
+                total -= artifact.size
+                removed.append(artifact.path)
+        return removed
+
+    def run(self, interval: float) -> None:
+        while not self._stop.is_set():
+            if removed := self.sweep():
+                print(f"Janitor removed {len(removed)} artifacts from {self.directory}")
+            self._stop.wait(interval)
+
+    def start(self, interval: float) -> threading.Thread:
+        thread = threading.Thread(target=self.run, args=(interval,), name="janitor", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(
+        description="Delete per-run artifacts on the shared volume by age and size quota"
+    )
+    parser.add_argument("directory", help="Directory of per-run artifacts (e.g. /shared/runs)")
+    parser.add_argument("--max-age-hours", type=float, default=24, help="Maximum artifact age")
+    parser.add_argument(
+        "--max-total-mb", type=int, default=10240, help="Size quota of the directory"
+    )
+    parser.add_argument(
+        "--min-idle-seconds",
+        type=float,
+        default=900,
+        help="Artifacts modified more recently than this are never removed",
+    )
+    parser.add_argument(
+        "--interval", type=float, help="Keep running, sweeping every this many seconds"
+    )
+    args = parser.parse_args()
+
+    janitor = Janitor(
+        args.directory,
+        max_age=args.max_age_hours * 3600,
+        max_total_bytes=args.max_total_mb * 1024 * 1024,
+        min_idle=args.min_idle_seconds,
+    )
+    if args.interval:
+        janitor.run(args.interval)
+    else:
+        for path in janitor.sweep():
+            print(f"Removed {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+# ``$name`` / ``${name}`` references to workflow params, secrets and step outputs.
+_REFERENCE = re.compile(r"\$\{?([A-Za-z_][A-Za-z0-9_]*)\}?")
+
+# Dependency installs in tool scripts; locally the current environment is used.
+_PIP_INSTALL = re.compile(r"^\s*pip install .*$", re.MULTILINE)
+
+SCRIPTS_ROOT = "/opt/scripts"
+
+
+class StepError(Exception):
+    """A step could not run or exited unsuccessfully."""
+
+    def __init__(self, message: str, status: str = "failed", output: str = ""):
+        super().__init__(message)
+        self.status = status
+        self.output = output
+
+
+def _named_values(values) -> dict[str, str]:
+    """``{name: value}`` from a dumped ``WorkflowParams``/``WorkflowSecrets``."""
+    if isinstance(values, dict):
+        if isinstance(values.get("root"), list):
+            values = values["root"]
+        else:
+            return {name: "" if value is None else str(value) for name, value in values.items()}
+    return {
+        item["name"]: "" if item.get("value") is None else str(item["value"])
+        for item in values or []
+    }
+
+
+def _depends(step: dict) -> list[str]:
+    depends = step.get("depends") or []
+    return [depends] if isinstance(depends, str) else list(depends)
+
+
+def resolve(text: str, context: dict[str, str]) -> str:
+    """Substitute references to known names; unknown ones are left as they are."""
+    return _REFERENCE.sub(
+        lambda match: context.get(match.group(1), match.group(0)), text
+    )
+
+
+def topological_order(steps: list[dict]) -> list[str]:
+    names = {step["name"] for step in steps}
+    order, visiting, done = [], set(), set()
+    by_name = {step["name"]: step for step in steps}
+
+    def visit(name: str) -> None:
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle through step {name}")
+        visiting.add(name)
+        for dependency in _depends(by_name[name]):
+            if dependency not in names:
+                raise ValueError(f"Step {name} depends on unknown step {dependency}")
+            visit(dependency)
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+
+    for step in steps:
+        visit(step["name"])
+    return order
+
+
+class LocalExecutor:
+    """Runs a workflow definition in-process, without docker or the Kubiya runner.
+
+    Steps are scheduled on a thread pool as soon as their dependencies have
+    finished, so independent steps run in parallel. Command steps and tool
+    scripts run as local subprocesses: tool files are written under a
+    temporary root and the ``/shared`` volume maps to ``shared_dir``. Agent
+    steps are answered by ``agent_responder``; without one they fail.
+    """
+
+    def __init__(
+        self,
+        shared_dir: str,
+        max_workers: int = 4,
+        agent_responder: Callable[[str, str], str] | None = None,
+        install_requirements: bool = False,
+    ):
+        self.shared_dir = os.path.abspath(shared_dir)
+        self.max_workers = max_workers
+        self.agent_responder = agent_responder
+        self.install_requirements = install_requirements
+        os.makedirs(self.shared_dir, exist_ok=True)
+
+    def execute(self, workflow_definition: dict) -> Iterator[str]:
+        """Run the workflow, yielding events shaped like ``execute_workflow``'s."""
+        steps = {step["name"]: step for step in workflow_definition.get("steps", [])}
+        order = topological_order(list(steps.values()))
+        params = _named_values(workflow_definition.get("params"))
+        secrets = _named_values(workflow_definition.get("secrets"))
+        outputs: dict[str, str] = {}
+        finished: dict[str, bool] = {}
+        running: dict[Future, str] = {}
+        step_started_at: dict[str, float] = {}
+        started_at = time.monotonic()
+
+        yield _event({"type": "workflow_started", "name": workflow_definition.get("name")})
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = list(order)
+            while pending or running:
+                for name in list(pending):
+                    dependencies = _depends(steps[name])
+                    if not all(dependency in finished for dependency in dependencies):
+                        continue
+                    pending.remove(name)
+                    if not all(finished[dependency] for dependency in dependencies):
+                        finished[name] = False
+                        yield _step_event("step_finished", name, "cancelled")
+                        continue
+                    running[
+                        pool.submit(self.run_step, steps[name], {**params, **secrets}, dict(outputs))
+                    ] = name
+                    step_started_at[name] = time.monotonic()
+                    yield _step_event("step_running", name, "running")
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    step = steps[name]
+                    try:
+                        output, status = future.result(), "finished"
+                    except StepError as e:
+                        print(f"Step {name} {e.status}: {e}", file=sys.stderr)
+                        output, status = e.output, e.status
+                    except Exception as e:
+                        print(f"Step {name} failed: {e}", file=sys.stderr)
+                        output, status = "", "failed"
+
+                    succeeded = status == "finished"
+                    if succeeded and step.get("output"):
+                        outputs[step["output"]] = output
+                    # Like the runner, a step allowed to fail does not stop its dependents
+                    finished[name] = succeeded or bool(
+                        (step.get("continue_on") or {}).get("failure")
+                    )
+                    yield _step_event(
+                        "step_finished",
+                        name,
+                        status,
+                        output,
+                        duration_sec=round(time.monotonic() - step_started_at[name], 3),
+                    )
+
+        succeeded = all(finished.values())
+        yield _event(
+            {
+                "type": "workflow_completed" if succeeded else "workflow_failed",
+                "end": True,
+                "duration_sec": round(time.monotonic() - started_at, 3),
+            }
+        )
+
+    def run_step(self, step: dict, variables: dict[str, str], outputs: dict[str, str]) -> str:
+        """Run one step; ``variables`` are the params and secrets, ``outputs`` upstream results."""
+        if "command" in step:
+            # Params stay shell variables in commands; only ``${OUTPUT}``
+            # references are substituted, as the runner does.
+            return self._run(
+                resolve(step["command"], outputs),
+                env=variables,
+                timeout=step.get("timeout_sec"),
+            )
+
+        context = {**variables, **outputs}
+        executor = step.get("executor") or {}
+        executor_type = str(executor.get("type", "")).rsplit(".", 1)[-1].lower()
+        config = executor.get("config") or {}
+        if executor_type == "tool":
+            return self._run_tool(config, context, step.get("timeout_sec"))
+        if executor_type == "agent":
+            if self.agent_responder is None:
+                raise StepError("agent steps need an agent responder to run locally")
+            return self.agent_responder(step["name"], resolve(config.get("message", ""), context))
+        raise StepError(f"executor type {executor_type!r} is not supported locally")
+
+    def _run_tool(self, config: dict, context: dict[str, str], timeout: float | None) -> str:
+        tool_def = config.get("tool_def") or {}
+        with tempfile.TemporaryDirectory(prefix="tool-") as root:
+
+            def local_path(text: str) -> str:
+                text = text.replace(SCRIPTS_ROOT, os.path.join(root, SCRIPTS_ROOT.lstrip("/")))
+                for volume in tool_def.get("with_volumes") or []:
+                    text = text.replace(volume["path"], self.shared_dir)
+                return text
+
+            for file in tool_def.get("with_files") or []:
+                destination = local_path(file["destination"])
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                with open(destination, "w", encoding="utf-8") as f:
+                    f.write(file.get("content", ""))
+
+            env = dict(context)
+            env.update(
+                {
+                    name: local_path(resolve(str(value), context))
+                    for name, value in (config.get("args") or {}).items()
+                }
+            )
+            env.update(
+                {
+                    name: resolve(str(value), context)
+                    for name, value in (config.get("secrets") or {}).items()
+                }
+            )
+
+            script = local_path(tool_def.get("content", ""))
+            if not self.install_requirements:
+                script = _PIP_INSTALL.sub(":", script)
+            return self._run(script, env=env, timeout=timeout, cwd=root)
+
+    def _run(
+        self,
+        script: str,
+        env: dict[str, str],
+        timeout: float | None = None,
+        cwd: str | None = None,
+    ) -> str:
+        try:
+            completed = subprocess.run(
+                ["bash", "-c", script],
+                env={**os.environ, **env},
+                cwd=cwd,
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+            )
+        except subprocess.TimeoutExpired as e:
+            output = e.stdout.decode() if isinstance(e.stdout, bytes) else e.stdout or ""
+            raise StepError(f"timed out after {timeout}s", status="timeout", output=output.strip())
+
+        if completed.stderr:
+            print(completed.stderr, end="", file=sys.stderr)
+        if completed.returncode != 0:
+            raise StepError(
+                f"exited with status {completed.returncode}", output=completed.stdout.strip()
+            )
+        return completed.stdout.strip()
+
+
+def _event(event: dict) -> str:
+    return json.dumps(event)
+
+
+def _step_event(
+    event_type: str,
+    name: str,
+    status: str,
+    output: str | None = None,
+    duration_sec: float | None = None,
+) -> str:
+    step = {"name": name, "status": status}
+    if output is not None:
+        step["output"] = output
+    if duration_sec is not None:
+        step["duration_sec"] = duration_sec
+    return _event({"type": event_type, "step": step})
+
+
+def file_responder(path: str) -> Callable[[str, str], str]:
+    """Agent responder answering every agent step with the contents of ``path``."""
+
+    def respond(step_name: str, message: str) -> str:
+        with open(path) as f:
+            return f.read()
+
+    return respond
+
+
+def execute_workflow(
+    workflow_definition: dict,
+    api_key: str | None = None,
+    runner: str | None = None,
+    shared_dir: str = "./state/shared",
+    max_workers: int = 4,
+    agent_responder: Callable[[str, str], str] | None = None,
+) -> Iterator[str]:
+    """Drop-in replacement for ``kubiya_workflow_sdk.execute_workflow`` running locally."""
+    executor = LocalExecutor(
+        shared_dir, max_workers=max_workers, agent_responder=agent_responder
+    )
+    return executor.execute(workflow_definition)
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(
+        description="Run a workflow definition (model_dump JSON) locally"
+    )
+    parser.add_argument("definition", help="Path to the workflow definition JSON, '-' for stdin")
+    parser.add_argument(
+        "--shared-dir", default="./state/shared", help="Local directory for the /shared volume"
+    )
+    parser.add_argument("--max-workers", type=int, default=4, help="Steps run in parallel")
+    parser.add_argument(
+        "--agent-response", help="File whose contents answer every agent step"
+    )
+    parser.add_argument(
+        "--install-requirements",
+        action="store_true",
+        help="Run the tools' pip installs instead of using the current environment",
+    )
+    args = parser.parse_args()
+
+    if args.definition == "-":
+        workflow_definition = json.load(sys.stdin)
+    else:
+        with open(args.definition) as f:
+            workflow_definition = json.load(f)
+
+    agent_responder = file_responder(args.agent_response) if args.agent_response else None
+    executor = LocalExecutor(
+        args.shared_dir,
+        max_workers=args.max_workers,
+        agent_responder=agent_responder,
+        install_requirements=args.install_requirements,
+    )
+    for line in executor.execute(workflow_definition):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections.abc import Iterable
+
+from kubiya_workflow_sdk.dsl_experimental import CommandStep
+
+from pipeline import stream_events
+
+# ``$name`` / ``${name}`` references to workflow params and step outputs.
+_REFERENCE = re.compile(r"\$\{?([A-Za-z_][A-Za-z0-9_]*)\}?")
+
+
+class StepMemo:
+    """Persistent store of step outputs keyed by a hash of the step's inputs.
+
+    One file per entry; ``load`` touches it, so a ``pipeline.janitor`` sweep
+    of ``root`` by modification time evicts the least recently used first.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.json")
+
+    def load(self, key: str) -> dict | None:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(self._path(key))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return entry
+
+    def save(self, key: str, step_name: str, output: str) -> None:
+        entry = {
+            "step": step_name,
+            "output": output,
+            "output_hash": hashlib.sha256(output.encode()).hexdigest(),
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(key))
+
+
+class MemoPlan:
+    """Memoization decisions for a single workflow build.
+
+    A step's key hashes its resolved inputs: its serialized definition (which
+    names the tool bundle by the digest of its sources), the values of the
+    params it references and the hashes of the outputs of every upstream
+    step, referenced or reached through ``depends``. The latter stand in for
+    the files those steps leave on the shared volume. ``apply`` swaps steps with a stored result for that key
+    for a cheap command step that replays the output under the same name, so
+    dependents still resolve ``${OUTPUT}`` as if the step had run. ``observe``
+    records results from the execution stream; keys of steps whose upstream
+    outputs were not known at build time are completed as those arrive.
+    """
+
+    def __init__(self, memo: StepMemo):
+        self.memo = memo
+        self.satisfied: set[str] = set()
+        self._steps: dict[str, tuple[str, dict, list[str], str | None]] = {}
+        self._output_hashes: dict[str, str] = {}
+        self._side_effects: set[str] = set()
+
+    def apply(
+        self,
+        steps: list,
+        params: dict,
+        volume_writers: Iterable[str] = (),
+        completed: dict[str, str] | None = None,
+        aliases: dict[str, str] | None = None,
+        side_effects: Iterable[str] = (),
+    ) -> list:
+        """Return ``steps`` with every memoized step marked as satisfied.
+
+        ``volume_writers`` names steps that leave files on the shared volume
+        for later steps; they are only skipped when every step downstream of
+        them is skipped too, since a cached output cannot recreate the files.
+        Re-running such a step does not invalidate its dependents: its key,
+        and therefore its expected output, is unchanged.
+
+        ``completed`` maps steps that already finished for this very event
+        (before the process running it died) to their outputs. They are
+        satisfied whatever their key, so side effects such as posting the
+        PR comment are not repeated on resume.
+
+        ``aliases`` replace text of the definitions of ``volume_writers``
+        before hashing, for the paths they write to that change between
+        events without changing what they compute, such as the per-run
+        artifact directory. Steps reading files there keep the real path,
+        and so the run attempt, in their key.
+
+        ``side_effects`` names steps whose effects are visible outside the
+        workflow, such as posting the PR comment. They are never memoized:
+        only ``completed`` skips them.
+        """
+        producers = {step.output: step.name for step in steps if step.output}
+        outputs = {step.name: step.output for step in steps if step.output}
+        dependencies = _transitive_dependencies(steps)
+        writers = set(volume_writers)
+        self._side_effects = set(side_effects)
+        hits: dict[str, tuple[str, dict]] = {}
+
+        for step in steps:
+            definition = json.dumps(
+                # Timeouts follow the per-event deadline, not the step's inputs
+                step.model_dump(
+                    exclude_none=True, exclude_defaults=True, exclude={"timeout_sec"}
+                ),
+                sort_keys=True,
+                default=str,
+            )
+            if step.name in writers:
+                for text, alias in (aliases or {}).items():
+                    definition = definition.replace(text, alias)
+            references = sorted(set(_REFERENCE.findall(definition)))
+            self._steps[step.name] = (
+                definition,
+                {
+                    name: params[name]
+                    for name in references
+                    if name in params and name not in producers
+                },
+                sorted(
+                    {name for name in references if name in producers}
+                    | {outputs[name] for name in dependencies[step.name] if name in outputs}
+                ),
+                step.output,
+            )
+            if step.name in self._side_effects:
+                continue
+            key = self.key(step.name)
+            if key and (entry := self.memo.load(key)):
+                hits[step.name] = (key, entry)
+                if step.output:
+                    self._output_hashes[step.output] = entry["output_hash"]
+
+        for name, output in (completed or {}).items():
+            if name not in self._steps or name in hits:
+                continue
+            output_hash = hashlib.sha256(output.encode()).hexdigest()
+            hits[name] = (output_hash, {"output": output, "output_hash": output_hash})
+            if variable := self._steps[name][3]:
+                self._output_hashes[variable] = output_hash
+
+        dependents = _transitive_dependents(steps)
+        satisfied = set(hits)
+        while unsafe := {
+            name
+            for name in satisfied & writers - set(completed or ())
+            if not dependents[name] <= satisfied
+        }:
+            satisfied -= unsafe
+        self.satisfied = satisfied
+
+        return [
+            _cached_step(step, *hits[step.name]) if step.name in satisfied else step
+            for step in steps
+        ]
+
+    def key(self, step_name: str) -> str | None:
+        """Input hash of ``step_name``, or None while an upstream output is unknown."""
+        definition, params, upstream, _ = self._steps[step_name]
+        if any(name not in self._output_hashes for name in upstream):
+            return None
+        inputs = {**params, **{name: self._output_hashes[name] for name in upstream}}
+        return hashlib.sha256(
+            json.dumps(
+                {"step": definition, "inputs": inputs}, sort_keys=True, default=str
+            ).encode()
+        ).hexdigest()
+
+    def record(self, step_name: str, output: str | None) -> None:
+        if step_name in self.satisfied or step_name not in self._steps:
+            return
+        output = output or ""
+        if variable := self._steps[step_name][3]:
+            self._output_hashes[variable] = hashlib.sha256(output.encode()).hexdigest()
+        if step_name in self._side_effects:
+            return
+        if key := self.key(step_name):
+            self.memo.save(key, step_name, output)
+
+    def observe(self, line) -> None:
+        """Record the result of a successfully finished step from a stream item."""
+        if not (event := stream_events.parse_event(line)):
+            return
+        finished = stream_events.step_finished(event)
+        if finished and finished[1]:
+            self.record(finished[0], finished[2])
+
+
+def _depends(step) -> list[str]:
+    if not step.depends:
+        return []
+    return [step.depends] if isinstance(step.depends, str) else list(step.depends)
+
+
+def _transitive(direct: dict[str, set[str]]) -> dict[str, set[str]]:
+    def collect(name: str, seen: set[str]) -> set[str]:
+        for neighbour in direct.get(name, ()):
+            if neighbour not in seen:
+                seen.add(neighbour)
+                collect(neighbour, seen)
+        return seen
+
+    return {name: collect(name, set()) for name in direct}
+
+
+def _transitive_dependents(steps: list) -> dict[str, set[str]]:
+    direct: dict[str, set[str]] = {step.name: set() for step in steps}
+    for step in steps:
+        for dependency in _depends(step):
+            direct.setdefault(dependency, set()).add(step.name)
+    return _transitive(direct)
+
+
+def _transitive_dependencies(steps: list) -> dict[str, set[str]]:
+    return _transitive({step.name: set(_depends(step)) for step in steps})
+
+
+def _cached_step(step, key: str, entry: dict) -> CommandStep:
+    delimiter = f"MEMO_{key[:16]}"
+    if not step.output:
+        return CommandStep(
+            name=step.name,
+            description=f"Cached result of {step.name}",
+            depends=step.depends,
+            command="true",
+        )
+    return CommandStep(
+        name=step.name,
+        description=f"Cached result of {step.name}",
+        depends=step.depends,
+        output=step.output,
+        command=f"cat <<'{delimiter}'\n{entry['output']}\n{delimiter}",
+    )
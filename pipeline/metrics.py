@@ -0,0 +1,23 @@
+from collections.abc import Iterable
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in sorted(labels.items())) + "}"
+
+
+def format_metric(
+    name: str,
+    metric_type: str,
+    help_text: str,
+    samples: Iterable[tuple[dict[str, str], float]],
+) -> str:
+    """One metric family in the Prometheus text exposition format."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    lines.extend(f"{name}{_labels(labels)} {value:g}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+
+import requests
+
+from tools.gh.get_failed_logs import API_URL
+
+
+def fetch_workflow_run(access_token: str, repository: str, run_id: int) -> dict:
+    """The ``workflow_run`` object of a run, shaped like the webhook payload's."""
+    response = requests.get(
+        f"{API_URL}/repos/{repository}/actions/runs/{run_id}",
+        headers={
+            "Authorization": f"Bearer {access_token}",
+            "Accept": "application/vnd.github+json",
+        },
+        timeout=30,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+class PrefetchRegistry:
+    """Tracks which failed job of a run attempt analysis was started for.
+
+    The first ``workflow_job`` failure of a run attempt claims it and
+    records the analysis of that job. When that job turns out to be the
+    only failure, the matching ``workflow_run`` event builds its workflow
+    for the same job so the memoized results line up; otherwise it analyzes
+    every failed job with the early analysis as a starting point. Claims are
+    files created with ``O_EXCL`` so concurrent workers agree on a single
+    winner; ``forget`` removes them once the run has been handled.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._in_flight: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def _key(repository: str, run_id: int, run_attempt: int) -> str:
+        return f"{repository.replace('/', '__')}-{run_id}-{run_attempt}"
+
+    def claim(self, repository: str, run_id: int, run_attempt: int, job_id: int) -> bool:
+        """Register ``job_id`` for prefetching; False if the attempt was already claimed."""
+        key = self._key(repository, run_id, run_attempt)
+        try:
+            fd = os.open(
+                os.path.join(self.root, f"{key}.json"),
+                os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+            )
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            json.dump({"job_id": job_id}, f)
+        with self._lock:
+            self._in_flight[key] = threading.Event()
+        return True
+
+    def _path(self, repository: str, run_id: int, run_attempt: int) -> str:
+        return os.path.join(self.root, f"{self._key(repository, run_id, run_attempt)}.json")
+
+    def _read(self, repository: str, run_id: int, run_attempt: int) -> dict:
+        try:
+            with open(self._path(repository, run_id, run_attempt)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def record_analysis(
+        self, repository: str, run_id: int, run_attempt: int, analysis: str | None
+    ) -> None:
+        claim = self._read(repository, run_id, run_attempt)
+        if not claim:
+            return
+        claim["analysis"] = analysis
+        path = self._path(repository, run_id, run_attempt)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(claim, f)
+        os.replace(f"{path}.tmp", path)
+
+    def finish(self, repository: str, run_id: int, run_attempt: int) -> None:
+        with self._lock:
+            done = self._in_flight.pop(self._key(repository, run_id, run_attempt), None)
+        if done is not None:
+            done.set()
+
+    def job_id(self, repository: str, run_id: int, run_attempt: int) -> int | None:
+        return self._read(repository, run_id, run_attempt).get("job_id")
+
+    def analysis(self, repository: str, run_id: int, run_attempt: int) -> str | None:
+        return self._read(repository, run_id, run_attempt).get("analysis")
+
+    def forget(self, repository: str, run_id: int, run_attempt: int) -> None:
+        try:
+            os.remove(self._path(repository, run_id, run_attempt))
+        except FileNotFoundError:
+            pass
+
+    def wait(self, repository: str, run_id: int, run_attempt: int, timeout: float) -> bool:
+        """Wait for an in-flight prefetch of the run attempt; True once none is running."""
+        with self._lock:
+            done = self._in_flight.get(self._key(repository, run_id, run_attempt))
+        return done is None or done.wait(max(0.0, timeout))
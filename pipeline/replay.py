@@ -0,0 +1,297 @@
+import argparse
+import copy
+import itertools
+import json
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import httpx
+
+DEFAULT_TARGET_URL = "http://0.0.0.0:8000/webhook"
+
+# Status codes the ingestion endpoint uses to refuse work it cannot take on.
+SHED_STATUS_CODES = {429, 503}
+
+BURST_SHAPES = ("steady", "burst", "ramp", "poisson")
+
+
+@dataclass
+class Delivery:
+    """A recorded webhook delivery: the GitHub headers plus the JSON body."""
+
+    headers: dict[str, str]
+    payload: dict
+
+
+@dataclass
+class ReplayStats:
+    accepted: int = 0
+    shed: int = 0
+    failed: int = 0
+    latencies: list[float] = field(default_factory=list)
+    status_codes: dict[int, int] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, status_code: int | None, latency: float) -> None:
+        with self.lock:
+            self.latencies.append(latency)
+            if status_code is None:
+                self.failed += 1
+                return
+            self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+            if 200 <= status_code < 300:
+                self.accepted += 1
+            elif status_code in SHED_STATUS_CODES:
+                self.shed += 1
+            else:
+                self.failed += 1
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (``pct`` in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def load_deliveries(path: str | None) -> list[Delivery]:
+    """Load recorded deliveries from a JSONL file.
+
+    Each line is either ``{"headers": {...}, "payload": {...}}`` or a bare
+    webhook body, in which case ``workflow_run`` headers are assumed. Without
+    a file the bundled ``gh_payload.raw_payload`` sample is replayed.
+    """
+    if path is None:
+        from gh_payload import raw_payload
+
+        return [Delivery(headers=_default_headers(raw_payload), payload=raw_payload)]
+
+    deliveries = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON: {e}")
+
+            if "payload" in record:
+                payload = record["payload"]
+                headers = record.get("headers") or _default_headers(payload)
+            else:
+                payload = record
+                headers = _default_headers(payload)
+            deliveries.append(Delivery(headers=dict(headers), payload=payload))
+
+    if not deliveries:
+        raise ValueError(f"No deliveries found in {path}")
+    return deliveries
+
+
+def _default_headers(payload: dict) -> dict[str, str]:
+    event = "workflow_job" if "workflow_job" in payload else "workflow_run"
+    return {
+        "X-GitHub-Event": event,
+        "X-GitHub-Delivery": str(uuid.uuid4()),
+        "Content-Type": "application/json",
+    }
+
+
+def mutate_delivery(
+    delivery: Delivery, seq: int, unique_run_ids: bool, vary_repos: int
+) -> Delivery:
+    """Return a copy of ``delivery`` made unique for the ``seq``-th send.
+
+    ``unique_run_ids`` offsets the workflow run id by ``seq`` so the ingestion
+    side does not dedupe replays, and ``vary_repos`` spreads deliveries over
+    that many synthetic repositories.
+    """
+    payload = copy.deepcopy(delivery.payload)
+    headers = dict(delivery.headers)
+    headers["X-GitHub-Delivery"] = str(uuid.uuid4())
+
+    if unique_run_ids:
+        if run := payload.get("workflow_run"):
+            run["id"] = int(run["id"]) + seq
+        if job := payload.get("workflow_job"):
+            job["run_id"] = int(job["run_id"]) + seq
+            job["id"] = int(job["id"]) + seq
+
+    if vary_repos > 1 and (repository := payload.get("repository")):
+        suffix = f"-{seq % vary_repos}"
+        repository["name"] = f"{repository['name']}{suffix}"
+        repository["full_name"] = f"{repository['full_name']}{suffix}"
+
+    return Delivery(headers=headers, payload=payload)
+
+
+def send_times(
+    shape: str, rate: float, count: int, burst_size: int
+) -> list[float]:
+    """Offsets (seconds from start) at which each of ``count`` sends is due."""
+    if shape == "steady":
+        return [i / rate for i in range(count)]
+    if shape == "burst":
+        return [(i // burst_size) * burst_size / rate for i in range(count)]
+    if shape == "ramp":
+        # Rate grows linearly from 0 to ``rate``: t_i = sqrt(2 * i * T / rate).
+        duration = 2 * count / rate
+        return [(2 * i * duration / rate) ** 0.5 for i in range(count)]
+    if shape == "poisson":
+        offsets, now = [], 0.0
+        for _ in range(count):
+            offsets.append(now)
+            now += random.expovariate(rate)
+        return offsets
+    raise ValueError(f"Unknown burst shape: {shape}")
+
+
+def replay(
+    target_url: str,
+    deliveries: list[Delivery],
+    count: int,
+    rate: float,
+    concurrency: int,
+    shape: str = "steady",
+    burst_size: int = 10,
+    unique_run_ids: bool = False,
+    vary_repos: int = 0,
+    timeout: float = 30,
+) -> tuple[ReplayStats, float]:
+    """Send ``count`` deliveries to ``target_url`` and return stats and wall time.
+
+    At most ``concurrency`` requests are in flight; when all slots are busy the
+    schedule slips rather than queueing unbounded work locally.
+    """
+    stats = ReplayStats()
+    slots = threading.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+
+    with httpx.Client(timeout=timeout, limits=limits) as client:
+
+        def send(delivery: Delivery) -> None:
+            started = time.perf_counter()
+            try:
+                response = client.post(
+                    target_url,
+                    content=json.dumps(delivery.payload),
+                    headers=delivery.headers,
+                )
+                stats.record(response.status_code, time.perf_counter() - started)
+            except httpx.HTTPError:
+                stats.record(None, time.perf_counter() - started)
+            finally:
+                slots.release()
+
+        templates = itertools.cycle(deliveries)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for seq, offset in enumerate(send_times(shape, rate, count, burst_size)):
+                if (delay := started + offset - time.perf_counter()) > 0:
+                    time.sleep(delay)
+                delivery = mutate_delivery(
+                    next(templates), seq, unique_run_ids, vary_repos
+                )
+                slots.acquire()
+                pool.submit(send, delivery)
+
+        elapsed = time.perf_counter() - started
+
+    return stats, elapsed
+
+
+def format_report(stats: ReplayStats, elapsed: float) -> dict:
+    total = stats.accepted + stats.shed + stats.failed
+    return {
+        "sent": total,
+        "accepted": stats.accepted,
+        "shed": stats.shed,
+        "failed": stats.failed,
+        "status_codes": dict(sorted(stats.status_codes.items())),
+        "elapsed_seconds": round(elapsed, 3),
+        "achieved_rate": round(total / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            name: round(percentile(stats.latencies, pct) * 1000, 2)
+            for name, pct in (("p50", 50), ("p90", 90), ("p95", 95), ("p99", 99), ("max", 100))
+        },
+    }
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(
+        description="Replay recorded GitHub webhook deliveries against the ingestion endpoint"
+    )
+    parser.add_argument(
+        "deliveries",
+        nargs="?",
+        help="JSONL file with recorded deliveries (defaults to the gh_payload sample)",
+    )
+    parser.add_argument("--target-url", default=DEFAULT_TARGET_URL, help="Ingestion endpoint URL")
+    parser.add_argument("--count", type=int, default=100, help="Number of deliveries to send")
+    parser.add_argument("--rate", type=float, default=10, help="Target sends per second")
+    parser.add_argument("--concurrency", type=int, default=10, help="Maximum requests in flight")
+    parser.add_argument("--shape", choices=BURST_SHAPES, default="steady", help="Arrival pattern")
+    parser.add_argument(
+        "--burst-size", type=int, default=10, help="Deliveries per burst for --shape burst"
+    )
+    parser.add_argument(
+        "--unique-run-ids",
+        action="store_true",
+        help="Give every send its own workflow run id",
+    )
+    parser.add_argument(
+        "--vary-repos",
+        type=int,
+        default=0,
+        help="Spread sends over this many synthetic repositories",
+    )
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    args = parser.parse_args()
+    if args.rate <= 0 or args.concurrency <= 0 or args.burst_size <= 0:
+        parser.error("--rate, --concurrency and --burst-size must be positive")
+
+    try:
+        deliveries = load_deliveries(args.deliveries)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    stats, elapsed = replay(
+        target_url=args.target_url,
+        deliveries=deliveries,
+        count=args.count,
+        rate=args.rate,
+        concurrency=args.concurrency,
+        shape=args.shape,
+        burst_size=args.burst_size,
+        unique_run_ids=args.unique_run_ids,
+        vary_repos=args.vary_repos,
+        timeout=args.timeout,
+    )
+    report = format_report(stats, elapsed)
+
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    print(f"Sent {report['sent']} deliveries in {report['elapsed_seconds']}s "
+          f"({report['achieved_rate']}/s)")
+    print(f"Accepted: {report['accepted']}  Shed: {report['shed']}  Failed: {report['failed']}")
+    print(f"Status codes: {report['status_codes']}")
+    print("Latency (ms): " + "  ".join(f"{k}={v}" for k, v in report["latency_ms"].items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from pipeline.metrics import format_metric
+
+
+@dataclass
+class RunnerSpec:
+    name: str
+    weight: float = 1.0
+    max_concurrency: int = 10
+
+    def __post_init__(self):
+        if self.weight <= 0:
+            raise ValueError(f"Runner {self.name} needs a positive weight, got {self.weight}")
+        if self.max_concurrency < 1:
+            raise ValueError(
+                f"Runner {self.name} needs a max_concurrency of at least 1, "
+                f"got {self.max_concurrency}"
+            )
+
+
+@dataclass
+class RunnerState:
+    spec: RunnerSpec
+    in_flight: int = 0
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+    ejections: int = 0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def load(self) -> float:
+        return self.in_flight / self.spec.weight
+
+
+@dataclass
+class Lease:
+    """A runner checked out for one execution; clear ``succeeded`` if its stream broke."""
+
+    runner: str
+    succeeded: bool = field(default=True)
+
+
+class RunnerPool:
+    """Dispatches executions to the least-loaded healthy runner.
+
+    Load is in-flight executions divided by the runner's weight, and a
+    runner never gets more than ``max_concurrency`` at once; when all are
+    at capacity ``lease`` waits for a slot. ``eject_after`` consecutive
+    stream failures take a runner out of rotation for ``eject_seconds``,
+    after which it gets traffic again; while any runner is healthy,
+    ``lease`` waits for one of them rather than using an ejected one. Only
+    if every runner is ejected is the least-loaded one used anyway, rather
+    than dropping the event.
+    """
+
+    def __init__(self, specs: list[RunnerSpec], eject_after: int = 3, eject_seconds: float = 60):
+        if not specs:
+            raise ValueError("A runner pool needs at least one runner")
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.runners = {spec.name: RunnerState(spec) for spec in specs}
+        self._available = threading.Condition()
+
+    def _pick(self, now: float) -> RunnerState | None:
+        states = list(self.runners.values())
+        healthy = [state for state in states if state.healthy(now)]
+        candidates = [
+            state for state in healthy or states if state.in_flight < state.spec.max_concurrency
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda state: (state.load(), -state.spec.weight))
+
+    def acquire(self, timeout: float | None = None) -> str:
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        with self._available:
+            while (state := self._pick(now := time.monotonic())) is None:
+                if expires_at is not None and now >= expires_at:
+                    raise TimeoutError("No runner became available")
+                # Releases notify; a runner coming back from ejection does not
+                waits = [
+                    runner.ejected_until - now
+                    for runner in self.runners.values()
+                    if runner.ejected_until > now
+                ]
+                if expires_at is not None:
+                    waits.append(expires_at - now)
+                self._available.wait(min(waits, default=None))
+            state.in_flight += 1
+            return state.spec.name
+
+    def release(self, runner: str, succeeded: bool) -> None:
+        with self._available:
+            state = self.runners[runner]
+            state.in_flight -= 1
+            if succeeded:
+                state.consecutive_failures = 0
+            else:
+                state.consecutive_failures += 1
+                if state.consecutive_failures >= self.eject_after:
+                    print(f"Ejecting runner {runner} after {state.consecutive_failures} failures")
+                    state.ejected_until = time.monotonic() + self.eject_seconds
+                    state.ejections += 1
+                    state.consecutive_failures = 0
+            self._available.notify()
+
+    @contextmanager
+    def lease(self, timeout: float | None = None):
+        lease = Lease(self.acquire(timeout))
+        try:
+            yield lease
+        except Exception:
+            lease.succeeded = False
+            raise
+        finally:
+            self.release(lease.runner, lease.succeeded)
+
+    def metrics(self) -> str:
+        now = time.monotonic()
+        with self._available:
+            states = list(self.runners.values())
+            return "".join(
+                [
+                    format_metric(
+                        "aels_runner_in_flight",
+                        "gauge",
+                        "Workflow executions in progress per runner",
+                        [({"runner": state.spec.name}, state.in_flight) for state in states],
+                    ),
+                    format_metric(
+                        "aels_runner_healthy",
+                        "gauge",
+                        "1 while the runner is in rotation",
+                        [({"runner": state.spec.name}, int(state.healthy(now))) for state in states],
+                    ),
+                    format_metric(
+                        "aels_runner_ejections_total",
+                        "counter",
+                        "Times the runner was ejected after consecutive stream failures",
+                        [({"runner": state.spec.name}, state.ejections) for state in states],
+                    ),
+                ]
+            )
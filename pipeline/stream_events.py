@@ -0,0 +1,60 @@
+import json
+
+# Step statuses reported by the runner that mean the step did not succeed.
+FAILED_STEP_STATUSES = {"failed", "error", "cancelled", "canceled", "aborted", "timeout"}
+
+
+def parse_event(line: str | bytes | dict) -> dict | None:
+    """Decode one item yielded by ``execute_workflow`` into an event dict.
+
+    The stream yields JSON strings (optionally still carrying the SSE
+    ``data: `` prefix); SSE control lines such as ``event:`` or ``retry:``
+    and anything that is not a JSON object are ignored.
+    """
+    if isinstance(line, dict):
+        return line
+    if isinstance(line, bytes):
+        line = line.decode("utf-8", errors="replace")
+
+    line = line.strip()
+    if line.startswith("data: "):
+        line = line[6:]
+    if not line.startswith("{"):
+        return None
+
+    try:
+        event = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    return event if isinstance(event, dict) else None
+
+
+def step_started(event: dict) -> str | None:
+    """Name of the step a ``step_running`` event refers to."""
+    if event.get("type") != "step_running":
+        return None
+    return (event.get("step") or {}).get("name")
+
+
+def step_finished(event: dict) -> tuple[str, bool, str | None] | None:
+    """``(name, succeeded, output)`` for a ``step_finished`` event."""
+    if event.get("type") != "step_finished":
+        return None
+
+    step = event.get("step") or {}
+    if not (name := step.get("name")):
+        return None
+
+    status = str(step.get("status", "")).lower()
+    output = step.get("output", event.get("output"))
+    if output is not None and not isinstance(output, str):
+        output = json.dumps(output)
+    return name, status not in FAILED_STEP_STATUSES, output
+
+
+def workflow_ended(event: dict) -> bool:
+    return bool(
+        event.get("end")
+        or event.get("finishReason")
+        or event.get("type") in ("workflow_completed", "workflow_failed")
+    )
@@ -0,0 +1,25 @@
+from tools.gh.diff_cache import DiffCache
+
+CRLF_DIFF = (
+    "diff --git a/setup.bat b/setup.bat\r\n"
+    "--- a/setup.bat\r\n"
+    "+++ b/setup.bat\r\n"
+    "@@ -1 +1 @@\r\n"
+    "-echo old\r\n"
+    "+echo new\r\n"
+)
+
+
+def test_hit_returns_crlf_diff_unchanged(tmp_path):
+    cache = DiffCache(str(tmp_path))
+    cache.put("owner/repo", "base", "head", CRLF_DIFF)
+
+    assert cache.get("owner/repo", "base", "head") == CRLF_DIFF
+    assert cache.stats() == {"hits": 1, "misses": 0}
+
+
+def test_miss_is_counted(tmp_path):
+    cache = DiffCache(str(tmp_path))
+
+    assert cache.get("owner/repo", "base", "head") is None
+    assert cache.stats() == {"hits": 0, "misses": 1}
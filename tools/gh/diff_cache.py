@@ -0,0 +1,128 @@
+import hashlib
+import os
+import tempfile
+import time
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Temp files left behind by writers that died mid-write are removed after this.
+STALE_TMP_SECONDS = 3600
+
+# The hit/miss counters start over once they reach this many lookups in
+# total, so they stay small and describe recent lookups.
+COUNTER_WINDOW = 100_000
+
+
+class DiffCache:
+    """Content-addressed PR diff cache shared by concurrent runs.
+
+    Entries are keyed by ``(repo, base_sha, head_sha)`` and written atomically
+    (temp file + ``os.replace``), so readers never observe a partial diff.
+    Recency is tracked through file mtimes, which lets any process evict the
+    least recently used entries once the cache grows past ``max_bytes``.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(repo: str, base_sha: str, head_sha: str) -> str:
+        return hashlib.sha256(f"{repo}\0{base_sha}\0{head_sha}".encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.diff")
+
+    def get(self, repo: str, base_sha: str, head_sha: str) -> str | None:
+        path = self._entry_path(self.key(repo, base_sha, head_sha))
+        try:
+            # newline="" on both sides: diffs keep their CRLF line endings
+            with open(path, encoding="utf-8", newline="") as f:
+                diff = f.read()
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used for LRU eviction
+        except FileNotFoundError:
+            pass
+        self._count("hits")
+        return diff
+
+    def put(self, repo: str, base_sha: str, head_sha: str, diff: str) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(diff)
+            os.replace(tmp_path, self._entry_path(self.key(repo, base_sha, head_sha)))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache fits ``max_bytes``.
+
+        Also rolls the hit/miss counters over once they fill ``COUNTER_WINDOW``.
+        Returns the number of removed entries.
+        """
+        self._roll_counters()
+        entries = []
+        now = time.time()
+        with os.scandir(self.root) as it:
+            for entry in it:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.startswith(".tmp-"):
+                    if now - stat.st_mtime > STALE_TMP_SECONDS:
+                        _unlink_quietly(entry.path)
+                elif entry.name.endswith(".diff"):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            _unlink_quietly(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def _count(self, counter: str) -> None:
+        # One byte appended per lookup: O_APPEND writes are atomic, so the
+        # file size is an exact counter even with many concurrent runs.
+        with open(os.path.join(self.root, counter), "ab") as f:
+            f.write(b".")
+
+    def _roll_counters(self) -> None:
+        counts = self.stats()
+        if sum(counts.values()) < COUNTER_WINDOW:
+            return
+        # Lookups counted by concurrent runs while truncating may be lost
+        for counter in counts:
+            with open(os.path.join(self.root, counter), "wb"):
+                pass
+
+    def stats(self) -> dict[str, int]:
+        counts = {}
+        for counter in ("hits", "misses"):
+            try:
+                counts[counter] = os.path.getsize(os.path.join(self.root, counter))
+            except FileNotFoundError:
+                counts[counter] = 0
+        return counts
+
+
+def _unlink_quietly(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
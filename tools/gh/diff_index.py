@@ -0,0 +1,186 @@
+import fnmatch
+import json
+import os
+import tempfile
+
+INDEX_VERSION = 1
+
+# Paths whose changes are produced by tools rather than written by hand.
+GENERATED_PATTERNS = (
+    "*.lock",
+    "*-lock.json",
+    "*-lock.yaml",
+    "go.sum",
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "*_pb2.py",
+    "*_pb2_grpc.py",
+    "*.pb.go",
+    "*.snap",
+    "dist/*",
+    "vendor/*",
+    "node_modules/*",
+)
+
+# Markers tools put at the top of files they generate.
+GENERATED_MARKERS = (b"@generated", b"DO NOT EDIT", b"Code generated by")
+
+
+def index_path(diff_path: str) -> str:
+    """Where the index of ``diff_path`` lives, e.g. /shared/pr_diff.index.json."""
+    return f"{os.path.splitext(diff_path)[0]}.index.json"
+
+
+def is_generated_path(path: str) -> bool:
+    name = os.path.basename(path)
+    return any(
+        fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(name, pattern)
+        for pattern in GENERATED_PATTERNS
+    )
+
+
+def _strip_prefix(path: bytes) -> str:
+    text = path.decode("utf-8", errors="replace").strip().strip('"')
+    return text[2:] if text[:2] in ("a/", "b/") else text
+
+
+def build_index(diff_path: str) -> dict:
+    """Index a unified diff in a single pass without holding it in memory.
+
+    Every file gets its path, status, added/deleted line counts, binary and
+    generated flags, and byte offsets of its section and of each hunk, so
+    consumers can seek straight to the parts they need.
+    """
+    files: list[dict] = []
+    current: dict | None = None
+    hunk: dict | None = None
+    offset = 0
+
+    def close_hunk(end: int) -> None:
+        if hunk is not None:
+            hunk["length"] = end - hunk["offset"]
+
+    def close_file(end: int) -> None:
+        close_hunk(end)
+        if current is not None:
+            current["length"] = end - current["offset"]
+
+    with open(diff_path, "rb") as f:
+        for line in f:
+            if line.startswith(b"diff --git "):
+                close_file(offset)
+                hunk = None
+                _, _, rest = line.rstrip(b"\n").partition(b" a/")
+                old_path, _, new_path = rest.rpartition(b" b/")
+                current = {
+                    "path": _strip_prefix(b"b/" + new_path),
+                    "old_path": _strip_prefix(b"a/" + old_path),
+                    "status": "modified",
+                    "additions": 0,
+                    "deletions": 0,
+                    "binary": False,
+                    "generated": False,
+                    "offset": offset,
+                    "length": 0,
+                    "hunks": [],
+                }
+                files.append(current)
+            elif current is None:
+                pass
+            elif line.startswith(b"@@"):
+                close_hunk(offset)
+                hunk = {
+                    "header": line.rstrip(b"\n").decode("utf-8", errors="replace"),
+                    "offset": offset,
+                    "length": 0,
+                }
+                current["hunks"].append(hunk)
+            elif hunk is not None and line.startswith(b"+"):
+                current["additions"] += 1
+                if any(marker in line for marker in GENERATED_MARKERS):
+                    current["generated"] = True
+            elif hunk is not None and line.startswith(b"-"):
+                current["deletions"] += 1
+            elif hunk is None:
+                if line.startswith(b"new file mode"):
+                    current["status"] = "added"
+                elif line.startswith(b"deleted file mode"):
+                    current["status"] = "deleted"
+                elif line.startswith(b"rename to "):
+                    current["status"] = "renamed"
+                    current["path"] = _strip_prefix(line[len(b"rename to "):])
+                elif line.startswith(b"Binary files ") or line.startswith(b"GIT binary patch"):
+                    current["binary"] = True
+            offset += len(line)
+
+    close_file(offset)
+
+    for entry in files:
+        entry["generated"] = entry["generated"] or is_generated_path(entry["path"])
+
+    return {
+        "version": INDEX_VERSION,
+        "diff_size": offset,
+        "files": files,
+        "totals": {
+            "files": len(files),
+            "additions": sum(entry["additions"] for entry in files),
+            "deletions": sum(entry["deletions"] for entry in files),
+        },
+    }
+
+
+def write_index(diff_path: str) -> dict:
+    """Build the index of ``diff_path`` and store it atomically next to it."""
+    index = build_index(diff_path)
+    directory = os.path.dirname(os.path.abspath(diff_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-index-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path(diff_path))
+    return index
+
+
+def load_index(diff_path: str) -> dict | None:
+    """The stored index of ``diff_path``, building it if missing or stale."""
+    if not os.path.exists(diff_path):
+        return None
+    try:
+        with open(index_path(diff_path)) as f:
+            index = json.load(f)
+        if (
+            index.get("version") == INDEX_VERSION
+            and index.get("diff_size") == os.path.getsize(diff_path)
+        ):
+            return index
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return build_index(diff_path)
+
+
+def read_section(diff_path: str, entry: dict) -> str:
+    """The bytes of one indexed file or hunk, read with a single seek."""
+    with open(diff_path, "rb") as f:
+        f.seek(entry["offset"])
+        return f.read(entry["length"]).decode("utf-8", errors="replace")
+
+
+def format_stats(index: dict, max_files: int = 50) -> str:
+    """``git diff --stat`` like summary of an index."""
+    lines = []
+    for entry in index["files"][:max_files]:
+        flags = [flag for flag in ("binary", "generated") if entry[flag]]
+        if entry["status"] != "modified":
+            flags.insert(0, entry["status"])
+        suffix = f" [{', '.join(flags)}]" if flags else ""
+        lines.append(f"{entry['path']} (+{entry['additions']}/-{entry['deletions']}){suffix}")
+    if len(index["files"]) > max_files:
+        lines.append(f"... and {len(index['files']) - max_files} more files")
+
+    totals = index["totals"]
+    lines.append(
+        f"{totals['files']} files changed, "
+        f"{totals['additions']} insertions(+), {totals['deletions']} deletions(-)"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,60 @@
+import codecs
+import mmap
+import os
+
+# Worst case UTF-8 width; reading this many bytes per character guarantees
+# ``max_chars`` characters are available whatever the text.
+MAX_BYTES_PER_CHAR = 4
+
+
+def _map(path: str | None):
+    """Read-only mapping of ``path``, or None if it is missing or empty."""
+    if not path:
+        return None
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+
+
+def read_head(path: str | None, max_chars: int) -> str:
+    """First ``max_chars`` characters of a UTF-8 file without reading the rest.
+
+    A multi-byte character cut by the byte window is dropped rather than
+    decoded into a replacement character.
+    """
+    if (mapped := _map(path)) is None:
+        return ""
+    with mapped:
+        data = mapped[: max_chars * MAX_BYTES_PER_CHAR]
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    return decoder.decode(data, final=False)[:max_chars]
+
+
+def read_tail(path: str | None, max_chars: int) -> str:
+    """Last ``max_chars`` characters of a UTF-8 file without reading the rest.
+
+    Continuation bytes at the start of the byte window belong to a character
+    that began before it and are skipped.
+    """
+    if (mapped := _map(path)) is None:
+        return ""
+    with mapped:
+        data = mapped[-max_chars * MAX_BYTES_PER_CHAR :]
+
+    start = 0
+    while start < len(data) and start < MAX_BYTES_PER_CHAR and data[start] & 0xC0 == 0x80:
+        start += 1
+    text = data[start:].decode("utf-8", errors="replace")
+    return text[-max_chars:]
+
+
+def file_size(path: str | None) -> int:
+    try:
+        return os.path.getsize(path) if path else 0
+    except FileNotFoundError:
+        return 0
@@ -0,0 +1,198 @@
+import argparse
+import re
+import sqlite3
+import sys
+import time
+
+try:
+    from .excerpts import read_tail
+except ImportError:  # Executed as a standalone script inside the tool container
+    from excerpts import read_tail
+
+DEFAULT_MAX_ROWS = 20000
+DEFAULT_MAX_AGE_DAYS = 90
+
+# Characters of the end of the failed logs the fingerprint is built from.
+LOG_TAIL_CHARS = 20000
+
+_ANSI = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d+)?Z?")
+_HEX = re.compile(r"\b[0-9a-f]{7,64}\b")
+_NUMBER = re.compile(r"\b\d+(\.\d+)?\b")
+_TMP_PATH = re.compile(r"/(tmp|home/runner/work)/\S*")
+_ERROR_LINE = re.compile(r"error|fail|exception|traceback|assert|fatal|panic", re.IGNORECASE)
+_TOKEN = re.compile(r"[A-Za-z_][A-Za-z0-9_]{3,}")
+# Generic runner epilogue present in every failed job; matching on it says nothing.
+# Checked once the line's timestamp prefix is gone.
+_GENERIC_LINE = re.compile(
+    r"^(##\[error\]|Error: )(Process completed with exit code|The operation was canceled)"
+)
+
+# Minimum share of the query's tokens a past failure must contain to be reported.
+MIN_OVERLAP = 0.5
+
+
+def normalize_excerpt(logs: str, max_lines: int = 40) -> str:
+    """Error lines of a log with run-specific noise (timestamps, SHAs, numbers) removed.
+
+    Two failures with the same cause normalize to (nearly) the same text.
+    """
+    lines = []
+    for line in logs.splitlines():
+        line = _TIMESTAMP.sub("", _ANSI.sub("", line)).strip()
+        if not _ERROR_LINE.search(line) or _GENERIC_LINE.search(line):
+            continue
+        line = _TMP_PATH.sub("<path>", line)
+        line = _HEX.sub("<sha>", line)
+        line = _NUMBER.sub("<n>", line)
+        line = " ".join(line.split())
+        if line and line not in lines:
+            lines.append(line)
+    return "\n".join(lines[-max_lines:])
+
+
+def excerpt_tokens(excerpt: str) -> list[str]:
+    """Distinct search tokens of an excerpt, leaving out runner boilerplate lines.
+
+    Excerpts indexed before the boilerplate was filtered may still contain it.
+    """
+    tokens = []
+    for line in excerpt.splitlines():
+        if not _GENERIC_LINE.search(line):
+            tokens.extend(_TOKEN.findall(line))
+    return list(dict.fromkeys(tokens))
+
+
+class FailureIndex:
+    """SQLite FTS5 index of past failures and the analyses posted for them."""
+
+    def __init__(
+        self,
+        path: str,
+        max_rows: int = DEFAULT_MAX_ROWS,
+        max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+    ):
+        self.max_rows = max_rows
+        self.max_age_days = max_age_days
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            """CREATE VIRTUAL TABLE IF NOT EXISTS failures USING fts5(
+                excerpt,
+                repo UNINDEXED,
+                workflow_name UNINDEXED,
+                pr_number UNINDEXED,
+                comment_url UNINDEXED,
+                analysis UNINDEXED,
+                created_at UNINDEXED
+            )"""
+        )
+
+    def add(
+        self,
+        excerpt: str,
+        repo: str,
+        workflow_name: str,
+        pr_number: int,
+        comment_url: str,
+        analysis: str,
+    ) -> None:
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO failures VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (excerpt, repo, workflow_name, pr_number, comment_url, analysis, time.time()),
+            )
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop entries older than ``max_age_days`` and beyond ``max_rows``."""
+        self.connection.execute(
+            "DELETE FROM failures WHERE created_at < ?",
+            (time.time() - self.max_age_days * 86400,),
+        )
+        self.connection.execute(
+            """DELETE FROM failures WHERE rowid IN (
+                SELECT rowid FROM failures ORDER BY rowid DESC LIMIT -1 OFFSET ?
+            )""",
+            (self.max_rows,),
+        )
+
+    def similar(
+        self,
+        excerpt: str,
+        limit: int = 3,
+        exclude_repo: str | None = None,
+        exclude_pr: int | None = None,
+    ) -> list[dict]:
+        """Past failures ranked by BM25 similarity to ``excerpt``."""
+        tokens = excerpt_tokens(excerpt)[:64]
+        if not tokens:
+            return []
+
+        query = " OR ".join(f'"{token}"' for token in tokens)
+        rows = self.connection.execute(
+            """SELECT excerpt, repo, workflow_name, pr_number, comment_url, analysis
+            FROM failures WHERE failures MATCH ? ORDER BY bm25(failures) LIMIT ?""",
+            (query, limit + 5),
+        ).fetchall()
+
+        results = []
+        for past_excerpt, repo, workflow_name, pr_number, comment_url, analysis in rows:
+            if repo == exclude_repo and str(pr_number) == str(exclude_pr):
+                continue
+            overlap = len(set(tokens) & set(excerpt_tokens(past_excerpt))) / len(tokens)
+            if overlap < MIN_OVERLAP:
+                continue
+            results.append(
+                {
+                    "repo": repo,
+                    "workflow_name": workflow_name,
+                    "pr_number": pr_number,
+                    "comment_url": comment_url,
+                    "analysis": analysis,
+                }
+            )
+        return results[:limit]
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def format_similar(similar: list[dict]) -> str:
+    return "\n".join(
+        f"- Seen before in {entry['repo']} PR #{entry['pr_number']} "
+        f"({entry['workflow_name']}): {entry['comment_url']}"
+        for entry in similar
+    )
+
+
+def main():
+    """Print links to past failures similar to the given failed logs."""
+    parser = argparse.ArgumentParser(
+        description="Look up past failures similar to the failed logs of a workflow run"
+    )
+    parser.add_argument("--db", required=True, help="Path to the failure index database")
+    parser.add_argument("--logs-path", required=True, help="Path to file with failed logs")
+    parser.add_argument("--repo", required=True, help="Repository in format owner/repo")
+    parser.add_argument("--pr-number", required=True, type=int, help="PR number")
+    parser.add_argument("--limit", type=int, default=3, help="Maximum number of matches")
+    args = parser.parse_args()
+
+    try:
+        index = FailureIndex(args.db)
+        similar = index.similar(
+            normalize_excerpt(read_tail(args.logs_path, LOG_TAIL_CHARS)),
+            limit=args.limit,
+            exclude_repo=args.repo,
+            exclude_pr=args.pr_number,
+        )
+        index.close()
+    except sqlite3.Error as e:
+        print(f"Failure index unavailable: {e}", file=sys.stderr)
+        similar = []
+
+    print(format_similar(similar) or "No similar past failures found")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,24 @@ import sys
 
 import requests
 
+try:
+    from .timeouts import parse_deadline, request_timeout
+    from .diff_cache import DEFAULT_MAX_BYTES, DiffCache
+    from .diff_index import format_stats, read_section, write_index
+except ImportError:  # Executed as a standalone script inside the tool container
+    from timeouts import parse_deadline, request_timeout
+    from diff_cache import DEFAULT_MAX_BYTES, DiffCache
+    from diff_index import format_stats, read_section, write_index
+
+# Overridable like in GitHub Actions, e.g. for GitHub Enterprise or a stub server
+SERVER_URL = os.getenv("GITHUB_SERVER_URL", "https://github.com")
+
 
 def get_pr_diff(
-    access_token: str, repository_url: str, pull_request_number: int
+    access_token: str,
+    repository_url: str,
+    pull_request_number: int,
+    deadline: float | None = None,
 ) -> str:
     """
     Fetches the diff for a specific pull request using the PyGithub library.
@@ -15,19 +30,20 @@ def get_pr_diff(
         access_token: Your GitHub Personal Access Token.
         repository_url: The full URL of the GitHub repository (e.g., "https://github.com/owner/repo").
         pull_request_number: The number of the pull request.
+        deadline: Epoch seconds by which the whole run should finish; bounds the request timeout.
     """
     if not access_token:
         raise ValueError(
             "GitHub token not found. Please set the GITHUB_TOKEN environment variable."
         )
 
-    diff_url = f"https://github.com/{repository_url}/pull/{pull_request_number}.diff"
+    diff_url = f"{SERVER_URL}/{repository_url}/pull/{pull_request_number}.diff"
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Accept": "application/vnd.github.v3.diff",  # Best practice to specify the media type
     }
 
-    response = requests.get(diff_url, headers=headers)
+    response = requests.get(diff_url, headers=headers, timeout=request_timeout(deadline))
     response.raise_for_status()
 
     return response.text
@@ -51,6 +67,23 @@ def main():
         "file_path",
         help="The full path where to save file with PR Diff (e.g., '/shared/pr_diff.txt').",
     )
+    parser.add_argument("--base-sha", help="SHA of the PR base commit (diff cache key).")
+    parser.add_argument("--head-sha", help="SHA of the PR head commit (diff cache key).")
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory of the shared diff cache (e.g., '/shared/diff_cache'). Requires --base-sha and --head-sha.",
+    )
+    parser.add_argument(
+        "--cache-max-bytes",
+        type=int,
+        default=DEFAULT_MAX_BYTES,
+        help="Size bound of the diff cache in bytes.",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=parse_deadline,
+        help="Epoch seconds by which the whole workflow run should finish.",
+    )
     args = parser.parse_args()
 
     if not (token := os.getenv("GH_TOKEN")):
@@ -60,13 +93,44 @@ def main():
 
     # --- Execute Core Logic ---
     try:
-        pr_diff = get_pr_diff(token, args.repo_url, args.pr_number)
-
-        with open(args.file_path, "w") as pr_diff_file:
+        cache = None
+        if args.cache_dir and args.base_sha and args.head_sha:
+            cache = DiffCache(args.cache_dir, max_bytes=args.cache_max_bytes)
+
+        pr_diff = None
+        if cache is not None:
+            pr_diff = cache.get(args.repo_url, args.base_sha, args.head_sha)
+
+        if pr_diff is None:
+            pr_diff = get_pr_diff(token, args.repo_url, args.pr_number, args.deadline)
+            if cache is not None:
+                cache.put(args.repo_url, args.base_sha, args.head_sha, pr_diff)
+
+        if cache is not None:
+            stats = cache.stats()
+            print(
+                f"Diff cache: hits={stats['hits']} misses={stats['misses']}",
+                file=sys.stderr,
+            )
+
+        os.makedirs(os.path.dirname(args.file_path) or ".", exist_ok=True)
+        with open(args.file_path, "w", newline="") as pr_diff_file:
             pr_diff_file.write(pr_diff)
+        del pr_diff
+
+        index = write_index(args.file_path)
+
+        print("\n--- PULL REQUEST DIFF STATS ---")
+        print(format_stats(index))
 
+        # Generated and binary files stay in the saved diff but are left out
+        # of the step output that ends up in the analysis prompt.
         print("\n--- PULL REQUEST DIFF ---")
-        print(pr_diff)
+        for entry in index["files"]:
+            if entry["generated"] or entry["binary"]:
+                print(f"diff --git a/{entry['old_path']} b/{entry['path']} (omitted)")
+            else:
+                print(read_section(args.file_path, entry), end="")
 
     except Exception as e:
         print(f"\nAn unexpected error occurred: {e}", file=sys.stderr)
@@ -0,0 +1,153 @@
+import argparse
+import os
+import sys
+
+import requests
+
+try:
+    from .timeouts import parse_deadline, request_timeout
+except ImportError:  # Executed as a standalone script inside the tool container
+    from timeouts import parse_deadline, request_timeout
+
+# Overridable like in GitHub Actions, e.g. for GitHub Enterprise or a stub server
+API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
+
+def _headers(access_token: str) -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {access_token}",
+        "Accept": "application/vnd.github+json",
+        "User-Agent": "CI-Pipeline-Failure-Bot/1.0",
+    }
+
+
+def list_failed_jobs(
+    access_token: str,
+    repository: str,
+    run_id: int,
+    run_attempt: int,
+    deadline: float | None = None,
+) -> list[dict]:
+    """
+    Lists the failed jobs of one attempt of a workflow run.
+
+    Args:
+        access_token: Your GitHub Personal Access Token.
+        repository: Repository in format owner/repo.
+        run_id: The workflow run id.
+        run_attempt: The attempt of the workflow run.
+        deadline: Epoch seconds by which the whole run should finish; bounds the request timeout.
+    """
+    jobs = []
+    url = f"{API_URL}/repos/{repository}/actions/runs/{run_id}/attempts/{run_attempt}/jobs"
+    params = {"per_page": 100}
+    while url:
+        response = requests.get(
+            url,
+            headers=_headers(access_token),
+            params=params,
+            timeout=request_timeout(deadline),
+        )
+        response.raise_for_status()
+        jobs.extend(response.json().get("jobs", []))
+        url = response.links.get("next", {}).get("url")
+        params = None  # The next link already carries the query
+
+    return [job for job in jobs if job.get("conclusion") == "failure"]
+
+
+def get_job_logs(
+    access_token: str, repository: str, job_id: int, deadline: float | None = None
+) -> str:
+    """
+    Downloads the plain text logs of a single workflow job.
+
+    Args:
+        access_token: Your GitHub Personal Access Token.
+        repository: Repository in format owner/repo.
+        job_id: The workflow job id.
+        deadline: Epoch seconds by which the whole run should finish; bounds the request timeout.
+    """
+    response = requests.get(
+        f"{API_URL}/repos/{repository}/actions/jobs/{job_id}/logs",
+        headers=_headers(access_token),
+        timeout=request_timeout(deadline, cap=120),
+    )
+    response.raise_for_status()
+    return response.text
+
+
+def tail_lines(text: str, max_lines: int) -> str:
+    lines = text.splitlines()
+    return "\n".join(lines[-max_lines:])
+
+
+def main():
+    """
+    Parses command-line arguments and saves the logs of the failed jobs of a workflow run.
+    """
+    parser = argparse.ArgumentParser(
+        description="Fetches the logs of the failed jobs of a GitHub Actions workflow run.",
+        epilog="Note: Your GitHub token must be available in the GH_TOKEN environment variable.",
+    )
+    parser.add_argument("repo", help="Repository in format owner/repo.")
+    parser.add_argument("run_id", type=int, help="The workflow run id.")
+    parser.add_argument(
+        "file_path",
+        help="The full path where to save file with failed logs (e.g., '/shared/failed_logs.txt').",
+    )
+    parser.add_argument(
+        "--run-attempt", type=int, default=1, help="The attempt of the workflow run."
+    )
+    parser.add_argument(
+        "--job-id",
+        type=lambda value: int(value) if value else None,
+        help="Only fetch the logs of this job instead of every failed job of the run.",
+    )
+    parser.add_argument(
+        "--max-output-lines",
+        type=int,
+        default=300,
+        help="Lines from the end of each job log to print as the step output.",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=parse_deadline,
+        help="Epoch seconds by which the whole workflow run should finish.",
+    )
+    args = parser.parse_args()
+
+    if not (token := os.getenv("GH_TOKEN")):
+        print("Error: The GH_TOKEN environment variable is not set.", file=sys.stderr)
+        print("Please set it to your GitHub Personal Access Token.", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        if args.job_id:
+            jobs = [{"id": args.job_id, "name": f"job {args.job_id}"}]
+        else:
+            jobs = list_failed_jobs(
+                token, args.repo, args.run_id, args.run_attempt, args.deadline
+            )
+
+        excerpts = []
+        os.makedirs(os.path.dirname(args.file_path) or ".", exist_ok=True)
+        with open(args.file_path, "w") as failed_logs_file:
+            for job in jobs:
+                logs = get_job_logs(token, args.repo, job["id"], args.deadline)
+                header = f"=== Job: {job['name']} (id {job['id']}) ===\n"
+                failed_logs_file.write(header)
+                failed_logs_file.write(logs)
+                failed_logs_file.write("\n")
+                excerpts.append(header + tail_lines(logs, args.max_output_lines))
+
+        print(f"Fetched logs of {len(jobs)} failed job(s)", file=sys.stderr)
+        print("\n".join(excerpts) or "No failed jobs found")
+
+    except Exception as e:
+        print(f"\nAn unexpected error occurred: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,81 @@
 import os
+import re
 import sys
 import argparse
+import sqlite3
 import requests
 
+try:
+    from .diff_index import format_stats, load_index
+    from .excerpts import file_size, read_head, read_tail
+    from .failure_index import (
+        LOG_TAIL_CHARS,
+        FailureIndex,
+        format_similar,
+        normalize_excerpt,
+    )
+    from .timeouts import parse_deadline, request_timeout
+except ImportError:  # Executed as a standalone script inside the tool container
+    from diff_index import format_stats, load_index
+    from excerpts import file_size, read_head, read_tail
+    from failure_index import (
+        LOG_TAIL_CHARS,
+        FailureIndex,
+        format_similar,
+        normalize_excerpt,
+    )
+    from timeouts import parse_deadline, request_timeout
+
+# Overridable like in GitHub Actions, e.g. for GitHub Enterprise or a stub server
+API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+SERVER_URL = os.getenv("GITHUB_SERVER_URL", "https://github.com")
+
+ANALYSIS_EXCERPT_CHARS = 2000
+LOG_EXCERPT_CHARS = 1500
+
+# What an output reference like ``${ANALYSIS_REPORT}`` looks like when the step
+# producing it failed or timed out and the runner left it unresolved.
+UNRESOLVED_OUTPUT = re.compile(r"^\$\{?[A-Za-z_][A-Za-z0-9_]*\}?$")
+
+DEGRADED_NOTICE = (
+    "The automated root cause analysis did not finish within its time budget. "
+    "Here is the failing log excerpt and a summary of the PR changes instead."
+)
+
+LOAD_SHED_NOTICE = (
+    "The automated root cause analysis was skipped because the failure "
+    "analysis service is under heavy load. "
+    "Here is the failing log excerpt and a summary of the PR changes instead."
+)
+
+KNOWN_FLAKY_NOTICE = (
+    "All failed tests are known to be flaky: their outcome flipped between "
+    "reruns of the same commit. Re-run the failed jobs before investigating.\n\n"
+    "Flaky tests:\n{}"
+)
+
+
+def has_analysis(analysis_report: str) -> bool:
+    report = analysis_report.strip()
+    return bool(report) and not UNRESOLVED_OUTPUT.match(report)
+
+
+def summarize_diff(diff_path: str | None, max_files: int = 20) -> str:
+    """Per-file change counts of the PR diff, taken from its stats index."""
+    if not diff_path or not (index := load_index(diff_path)) or not index["files"]:
+        return "No diff available"
+    return format_stats(index, max_files=max_files)
+
+
+def open_failure_index(path: str | None) -> FailureIndex | None:
+    if not path:
+        return None
+    try:
+        return FailureIndex(path)
+    except sqlite3.Error as e:
+        print(f"⚠️ Failure index unavailable: {e}", file=sys.stderr)
+        return None
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(
@@ -17,26 +90,50 @@ def main() -> None:
     parser.add_argument(
         "--failed-logs-path", required=True, help="Path to file with failed logs"
     )
+    parser.add_argument(
+        "--diff-path", help="Path to file with the PR diff (used when analysis is missing)"
+    )
+    parser.add_argument(
+        "--workflow-name", default="", help="Name of the failed workflow"
+    )
+    parser.add_argument(
+        "--failure-index", help="Path to the database of past failures"
+    )
+    parser.add_argument(
+        "--known-flaky",
+        default="",
+        help="Comma separated ids of the failed tests known to be flaky; skips the analysis",
+    )
+    parser.add_argument(
+        "--degraded",
+        action="store_true",
+        help="The analysis was skipped to shed load; post the log excerpt and diff summary",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=parse_deadline,
+        help="Epoch seconds by which the whole workflow run should finish",
+    )
 
     args = parser.parse_args()
 
-    with open(args.analysis_path) as f:
-        analysis_report = f.read()
-
-    with open(args.failed_logs_path) as f:
-        failed_logs = f.read()
+    # Only the excerpts that end up in the comment are read, so memory use
+    # does not grow with the size of the log files.
+    analysis_report = read_head(args.analysis_path, ANALYSIS_EXCERPT_CHARS)
+    failed_logs = read_head(args.failed_logs_path, LOG_EXCERPT_CHARS)
+    failure_excerpt = normalize_excerpt(read_tail(args.failed_logs_path, LOG_TAIL_CHARS))
+    failure_index = open_failure_index(args.failure_index)
 
     if not (github_token := os.getenv("GH_TOKEN")):
-        print("❌ ERROR: GH_TOKEN is not set")
+        print("❌ ERROR: GH_TOKEN is not set", file=sys.stderr)
         sys.exit(1)
 
-    print("=== GitHub PR Comment Tool Started ===")
-    print(f"Repo: {args.repo}")
-    print(f"PR Number: {args.number}")
-    print(f"Analysis report length: {len(analysis_report)} characters")
-    print(f"Failed logs length: {len(failed_logs)} characters")
-    print(f"Token length: {len(github_token)} characters")
-    print(f"Token preview: {github_token}...")
+    print("=== GitHub PR Comment Tool Started ===", file=sys.stderr)
+    print(f"Repo: {args.repo}", file=sys.stderr)
+    print(f"PR Number: {args.number}", file=sys.stderr)
+    print(f"Analysis report size: {file_size(args.analysis_path)} bytes", file=sys.stderr)
+    print(f"Failed logs size: {file_size(args.failed_logs_path)} bytes", file=sys.stderr)
+    print(f"Token length: {len(github_token)} characters", file=sys.stderr)
 
     # Setup headers for GitHub API
     headers = {
@@ -47,26 +144,53 @@ def main() -> None:
 
     try:
         # Test GitHub API access first
-        print("=== Testing GitHub API Access ===")
-        user_response = requests.get("https://api.github.com/user", headers=headers)
+        print("=== Testing GitHub API Access ===", file=sys.stderr)
+        user_response = requests.get(
+            f"{API_URL}/user",
+            headers=headers,
+            timeout=request_timeout(args.deadline),
+        )
         user_response.raise_for_status()
 
-        print("✅ GitHub API authentication successful")
+        print("✅ GitHub API authentication successful", file=sys.stderr)
 
         # Check if PR exists
-        print("=== Checking if PR exists ===")
+        print("=== Checking if PR exists ===", file=sys.stderr)
         pr_response = requests.get(
-            f"https://api.github.com/repos/{args.repo}/pulls/{args.number}",
+            f"{API_URL}/repos/{args.repo}/pulls/{args.number}",
             headers=headers,
+            timeout=request_timeout(args.deadline),
         )
         pr_response.raise_for_status()
 
         # Process analysis report and logs safely
-        analysis_summary = analysis_report[:2000]
-        log_summary = failed_logs[:1500]
+        known_flaky = [test_id for test_id in args.known_flaky.split(",") if test_id]
+        if known_flaky:
+            analysis_report = ""  # Never index a stale analysis left on the volume
+            analysis_summary = KNOWN_FLAKY_NOTICE.format(
+                "\n".join(f"- {test_id}" for test_id in known_flaky)
+            )
+        elif args.degraded:
+            analysis_report = ""
+            analysis_summary = LOAD_SHED_NOTICE
+        elif has_analysis(analysis_report):
+            analysis_summary = analysis_report
+        else:
+            print("⚠️ Analysis report is missing, posting degraded comment", file=sys.stderr)
+            analysis_summary = DEGRADED_NOTICE
+        log_summary = failed_logs
+        diff_summary = summarize_diff(args.diff_path)
+        similar = (
+            failure_index.similar(
+                failure_excerpt, exclude_repo=args.repo, exclude_pr=args.number
+            )
+            if failure_index
+            else []
+        )
+        similar_summary = format_similar(similar) or "No similar past failures found"
 
         workflow_url = (
-            f"https://github.com/{args.repo}/actions/runs/{args.workflow_run_id}"
+            f"{SERVER_URL}/{args.repo}/actions/runs/{args.workflow_run_id}"
         )
 
         # Create the comment content with better formatting
@@ -85,47 +209,74 @@ The workflow execution failed during the CI/CD pipeline. Here's the automated an
 {}
 ```
 
+### 🗂️ Changed Files
+```
+{}
+```
+
+### 🔁 Seen Before
+{}
+
 ### 🔗 Quick Links
 - [View Workflow Run]({})
-- [Repository Actions](https://github.com/{}/actions)
+- [Repository Actions]({}/{}/actions)
 
 ---
 <sub>🤖 This analysis was automatically generated by the CI/CD failure detection system</sub>"""
 
         comment_body = comment_template.format(
-            analysis_summary, log_summary, workflow_url, args.repo
+            analysis_summary,
+            log_summary,
+            diff_summary,
+            similar_summary,
+            workflow_url,
+            SERVER_URL,
+            args.repo,
         )
 
-        print("=== Posting PR Comment ===")
-        print(f"Comment length: {len(comment_body)} characters")
+        print("=== Posting PR Comment ===", file=sys.stderr)
+        print(f"Comment length: {len(comment_body)} characters", file=sys.stderr)
 
         # Post the comment to GitHub API
         comment_data = {"body": comment_body}
         comment_response = requests.post(
-            f"https://api.github.com/repos/{args.repo}/issues/{args.number}/comments",
+            f"{API_URL}/repos/{args.repo}/issues/{args.number}/comments",
             headers=headers,
             json=comment_data,
+            timeout=request_timeout(args.deadline),
         )
         comment_response.raise_for_status()
         comment_result = comment_response.json()
 
-        print(f"✅ SUCCESS: Comment posted successfully to PR #{args.number}")
-        print(f"Comment ID: {comment_result.get('id', 'Unknown')}")
-        print(f"Comment URL: {comment_result.get('html_url', 'Unknown')}")
+        print(f"✅ SUCCESS: Comment posted successfully to PR #{args.number}", file=sys.stderr)
+        print(f"Comment ID: {comment_result.get('id', 'Unknown')}", file=sys.stderr)
+        print(f"Comment URL: {comment_result.get('html_url', 'Unknown')}", file=sys.stderr)
+
+        if failure_index and failure_excerpt and has_analysis(analysis_report):
+            failure_index.add(
+                failure_excerpt,
+                args.repo,
+                args.workflow_name,
+                args.number,
+                comment_result.get("html_url", ""),
+                analysis_report,
+            )
+            print("✅ Failure recorded in the failure index", file=sys.stderr)
 
-        # Output the comment URL for workflow to capture
+        # The comment URL is the only stdout output: the workflow captures it
+        # as the step output for the Teams card
         print(comment_result.get("html_url", ""))
 
-        print("=== GitHub PR Comment Tool Completed Successfully ===")
+        print("=== GitHub PR Comment Tool Completed Successfully ===", file=sys.stderr)
 
     except requests.exceptions.RequestException as e:
-        print(f"❌ HTTP ERROR: {e}")
+        print(f"❌ HTTP ERROR: {e}", file=sys.stderr)
         if hasattr(e, "response") and e.response is not None:
-            print(f"Response status: {e.response.status_code}")
-            print(f"Response body: {e.response.text}")
+            print(f"Response status: {e.response.status_code}", file=sys.stderr)
+            print(f"Response body: {e.response.text}", file=sys.stderr)
         sys.exit(1)
     except Exception as e:
-        print(f"❌ UNEXPECTED ERROR: {e}")
+        print(f"❌ UNEXPECTED ERROR: {e}", file=sys.stderr)
         sys.exit(1)
 
 
@@ -0,0 +1,19 @@
+import time
+
+DEFAULT_TIMEOUT = 30
+
+# Even past the deadline a request gets this long, so late steps can still
+# report partial results instead of failing outright.
+MIN_TIMEOUT = 5
+
+
+def request_timeout(deadline: float | None, cap: float = DEFAULT_TIMEOUT) -> float:
+    """Timeout for the next HTTP request given the run's deadline (epoch seconds)."""
+    if deadline is None:
+        return cap
+    return max(MIN_TIMEOUT, min(cap, deadline - time.time()))
+
+
+def parse_deadline(value: str) -> float | None:
+    """argparse type for ``--deadline``; an empty value means no deadline."""
+    return float(value) if value else None
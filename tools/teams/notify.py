@@ -0,0 +1,123 @@
+"""
+python tools/teams/notify.py --pipeline-name one --pr-title "Test fails randomly" --pr-url a/b/c --author Me --workflow-url b/c/d --gh-summary-url c/d/e
+python tools/teams/notify.py notifications.json
+"""
+import argparse
+import json
+import sys
+
+import httpx
+
+try:
+    from .prepare_summary import create_teams_payload, load_diff_stats
+    from .send_message import send_message
+    from .webhook_config import DEFAULT_WEBHOOK_URL, PIPELINE_WEBHOOK_MAPPING
+except ImportError:  # Executed as a standalone script inside the tool container
+    from prepare_summary import create_teams_payload, load_diff_stats
+    from send_message import send_message
+    from webhook_config import DEFAULT_WEBHOOK_URL, PIPELINE_WEBHOOK_MAPPING
+
+# Fields of a notification passed on to ``create_teams_payload``.
+CARD_FIELDS = (
+    "pr_title",
+    "pr_url",
+    "workflow_url",
+    "author",
+    "gh_summary_url",
+    "triggered_at",
+    "diff_stats",
+)
+
+
+def load_notifications(source: str) -> list[dict]:
+    """Notifications from a JSON file, or stdin for ``-``; one object or a list."""
+    if source == "-":
+        data = json.load(sys.stdin)
+    else:
+        with open(source) as f:
+            data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+def notify(
+    notifications: list[dict],
+    pipeline_webhook_mapping: dict[str, str],
+    default_webhook_url: str,
+) -> int:
+    """Build and send a card per notification over one connection.
+
+    Returns the number of notifications that could not be sent.
+    """
+    failures = 0
+    with httpx.Client() as client:
+        for notification in notifications:
+            pipeline_name = notification.get("pipeline_name", "")
+            webhook_url = pipeline_webhook_mapping.get(pipeline_name, default_webhook_url)
+            if not webhook_url:
+                print(f"❌ No Teams webhook configured for pipeline: {pipeline_name}")
+                failures += 1
+                continue
+
+            card_fields = {field: notification.get(field) for field in CARD_FIELDS}
+            if "diff_stats" not in notification:
+                card_fields["diff_stats"] = load_diff_stats(notification.get("diff_index"))
+            card = create_teams_payload(**card_fields)
+            try:
+                send_message(webhook_url=webhook_url, message=card, client=client)
+            except httpx.HTTPError as e:
+                print(f"❌ Failed to send message for pipeline {pipeline_name}: {e}")
+                failures += 1
+                continue
+            print(f"✅ Message sent for pipeline: {pipeline_name}")
+    return failures
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(
+        description="Build Teams MessageCards and send them to the pipelines' webhooks"
+    )
+    parser.add_argument(
+        "input",
+        nargs="?",
+        help="JSON file with one notification or a list of them, '-' for stdin. "
+        "Without it a single notification is built from the options below",
+    )
+    parser.add_argument("--pipeline-name", help="Name of the pipeline to get webhook URL for")
+    parser.add_argument("--pr-title", help="Title of the pull request")
+    parser.add_argument("--pr-url", help="URL of the pull request")
+    parser.add_argument("--author", help="Author of the pull request")
+    parser.add_argument("--workflow-url", help="URL of the failed workflow run")
+    parser.add_argument("--gh-summary-url", help="URL of the PR analysis comment")
+    parser.add_argument(
+        "--triggered-at", help="Timestamp when the workflow was triggered (ISO format)"
+    )
+    parser.add_argument(
+        "--diff-index", help="Path to the PR diff stats index (e.g. /shared/pr_diff.index.json)"
+    )
+
+    args = parser.parse_args()
+
+    if args.input:
+        notifications = load_notifications(args.input)
+    else:
+        notifications = [
+            {
+                "pipeline_name": args.pipeline_name,
+                "pr_title": args.pr_title,
+                "pr_url": args.pr_url,
+                "author": args.author,
+                "workflow_url": args.workflow_url,
+                "gh_summary_url": args.gh_summary_url,
+                "triggered_at": args.triggered_at,
+                "diff_index": args.diff_index,
+            }
+        ]
+
+    if failures := notify(notifications, PIPELINE_WEBHOOK_MAPPING, DEFAULT_WEBHOOK_URL):
+        print(f"{failures} of {len(notifications)} messages were not sent")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
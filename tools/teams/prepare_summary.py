@@ -16,6 +16,17 @@ def format_timestamp(timestamp: str | None) -> str:
         return timestamp
 
 
+def load_diff_stats(diff_index_path: str | None) -> dict | None:
+    """Totals of a PR diff stats index; None without a readable one."""
+    if not diff_index_path:
+        return None
+    try:
+        with open(diff_index_path) as f:
+            return json.load(f)["totals"]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return None
+
+
 def create_teams_payload(
     pr_title: str,
     pr_url: str,
@@ -23,11 +34,34 @@ def create_teams_payload(
     author: str,
     gh_summary_url: str,
     triggered_at: str | None = None,
+    diff_stats: dict | None = None,
 ) -> dict:
     """Create the Teams MessageCard payload."""
 
     # Process variables
     formatted_time = format_timestamp(triggered_at)
+    facts = [
+        {
+            "name": "👤 Author",
+            "value": author,
+        },
+        {
+            "name": "Pull Request URL",
+            "value": pr_url,
+        },
+        {
+            "name": "Failed Workflow URL",
+            "value": workflow_url,
+        },
+    ]
+    if diff_stats:
+        facts.append(
+            {
+                "name": "📝 Changes",
+                "value": f"{diff_stats['files']} files "
+                f"(+{diff_stats['additions']}/-{diff_stats['deletions']})",
+            }
+        )
 
     # Create the payload
     payload = {
@@ -39,20 +73,7 @@ def create_teams_payload(
             {
                 "activityTitle": f"🚨 {pr_title}",
                 "activitySubtitle": f"Workflow failed at {formatted_time}",
-                "facts": [
-                    {
-                        "name": "👤 Author",
-                        "value": author,
-                    },
-                    {
-                        "name": "Pull Request URL",
-                        "value": pr_url,
-                    },
-                    {
-                        "name": "Failed Workflow URL",
-                        "value": workflow_url,
-                    },
-                ],
+                "facts": facts,
                 "markdown": True,
             }
         ],
@@ -110,6 +131,9 @@ def main():
     parser.add_argument(
         "--triggered-at", help="Timestamp when the workflow was triggered (ISO format)"
     )
+    parser.add_argument(
+        "--diff-index", help="Path to the PR diff stats index (e.g. /shared/pr_diff.index.json)"
+    )
 
     args = parser.parse_args()
 
@@ -121,6 +145,7 @@ def main():
         gh_summary_url=args.gh_summary_url,
         workflow_url=args.workflow_url,
         triggered_at=args.triggered_at,
+        diff_stats=load_diff_stats(args.diff_index),
     )
 
     # Output the JSON payload
@@ -2,11 +2,16 @@ import argparse
 import json
 
 import httpx
-from .webhook_config import DEFAULT_WEBHOOK_URL, PIPELINE_WEBHOOK_MAPPING
 
+try:
+    from .webhook_config import DEFAULT_WEBHOOK_URL, PIPELINE_WEBHOOK_MAPPING
+except ImportError:  # Executed as a standalone script inside the tool container
+    from webhook_config import DEFAULT_WEBHOOK_URL, PIPELINE_WEBHOOK_MAPPING
 
-def send_message(webhook_url: str, message: str) -> None:
-    response = httpx.post(
+
+def send_message(webhook_url: str, message: dict, client: httpx.Client | None = None) -> None:
+    """Post a card to a Teams webhook, over ``client``'s connection if given."""
+    response = (client or httpx).post(
         webhook_url,
         json=message,
         headers={"Content-Type": "application/json"},
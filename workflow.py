@@ -1,10 +1,41 @@
 from kubiya_workflow_sdk.dsl_experimental import *  # noqa
-import inspect
 
 from kubiya_workflow_sdk.dsl_experimental import WorkflowParams, WorkflowSecrets, Secret, Volume
 
-from tools.teams import send_message, webhook_config, prepare_summary
-from tools.gh import get_diff, post_pr_comment
+from pipeline.bundles import get_bundle
+from pipeline.deadlines import Deadline
+from pipeline.memo import MemoPlan
+
+DIFF_CACHE_DIR = "/shared/diff_cache"
+# Each run attempt keeps its artifacts in its own directory below this one,
+# so concurrent executions can share the volume; pipeline.janitor cleans up.
+RUNS_DIR = "/shared/runs"
+FAILURE_INDEX_PATH = "/shared/failure_index.db"
+
+# Upper bound in seconds for each step; with a deadline the step gets the
+# smaller of this and what is left of the run's end-to-end budget.
+STEP_TIMEOUTS = {
+    "echo-show-input-params": 30,
+    "install-tool-bundle": 60,
+    "get-gh-failed-logs": 120,
+    "get-gh-pr-diff": 120,
+    "find-similar-failures": 30,
+    "failure-analysis": 600,
+    "save-pr-summary": 30,
+    "post-pr-summary": 90,
+    "send-ms-teams-message": 60,
+}
+
+# Steps every earlier step leaves room for, so that slow fetches or a slow
+# analysis still let the degraded comment go out before the deadline.
+PROTECTED_STEPS = ("save-pr-summary", "post-pr-summary")
+# The deadline covers posting the PR comment; the Teams card that follows
+# it keeps its full budget rather than what the deadline leaves over.
+DEADLINE_EXEMPT_STEPS = ("send-ms-teams-message",)
+
+# Steps whose effects are visible outside the workflow: they are never
+# memoized, and when resuming an interrupted event never run a second time.
+SIDE_EFFECT_STEPS = ("post-pr-summary", "send-ms-teams-message")
 
 
 def build_workflow(
@@ -14,22 +45,63 @@ def build_workflow(
     pr_title: str,
     pr_url: str,
     pr_number: int,
+    base_sha: str,
+    head_sha: str,
+    run_attempt: int,
     repo_url: str,
     author: str,
     triggered_at: str,
     GH_TOKEN: str,
+    secrets: dict[str, str] | None = None,
+    memo_plan: MemoPlan | None = None,
+    deadline: Deadline | None = None,
+    failed_job_id: int | None = None,
+    prefetch: bool = False,
+    known_flaky: list[str] | None = None,
+    degraded: bool = False,
+    completed_steps: dict[str, str] | None = None,
+    shared_analysis: str | None = None,
+    prefetched_analysis: str | None = None,
 ) -> Workflow:
+    """Build the failure analysis workflow for one failed workflow run.
+
+    With ``failed_job_id`` only that job's logs are analyzed instead of every
+    failed job of the run. ``prefetch`` builds just the log/diff fetch and
+    analysis steps, whose memoized results a later full build reuses. With
+    ``known_flaky`` test ids the analysis is skipped and a templated comment
+    naming the flaky tests is posted instead. ``degraded`` also skips the
+    analysis, for when the service sheds load: the comment carries the log
+    excerpt and diff stats and a Teams card is sent. ``secrets`` are added to the
+    workflow's secrets next to ``GH_TOKEN``. ``completed_steps`` are steps
+    with side effects that already ran for this event; they are not repeated.
+    ``shared_analysis`` is the report of another failure with the same log
+    fingerprint; it stands in for the analysis (through ``memo_plan``).
+    ``prefetched_analysis`` is the early analysis of one of several failed
+    jobs; the agent builds on it when analyzing all of them.
+    """
+
     param_pipeline_name = Parameter(name="pipeline_name", value=workflow_name)
     param_pr_title = Parameter(name="pr_title", value=pr_title)
     param_pr_url = Parameter(name="pr_url", value=pr_url)
     param_repo_url = Parameter(name="repo_url", value=repo_url)
     param_pr_number = Parameter(name="pr_number", value=pr_number)
+    param_base_sha = Parameter(name="base_sha", value=base_sha)
+    param_head_sha = Parameter(name="head_sha", value=head_sha)
+    param_run_attempt = Parameter(name="run_attempt", value=run_attempt)
     param_author = Parameter(name="author", value=author)
     param_workflow_url = Parameter(name="workflow_url", value=workflow_url)
     param_workflow_run_id = Parameter(name="workflow_run_id", value=workflow_run_id)
     param_triggered_at = Parameter(name="triggered_at", value=triggered_at)
+    param_deadline_at = Parameter(
+        name="deadline_at", value=int(deadline.expires_at) if deadline else ""
+    )
+    param_failed_job_id = Parameter(name="failed_job_id", value=failed_job_id or "")
 
     shared_volume = Volume(name="shared_volume", path="/shared")
+    run_dir = f"{RUNS_DIR}/{workflow_run_id}-{run_attempt}"
+    # Tool scripts run from a content-addressed bundle on the shared volume
+    # (see pipeline.bundles) rather than being inlined into every step.
+    tool_bundle = get_bundle()
 
     step_0 = CommandStep(
         name="echo-show-input-params",
@@ -39,6 +111,9 @@ echo "{param_pr_title.name}=${param_pr_title.name};" && \
 echo "{param_pr_url.name}=${param_pr_url.name};" && \
 echo "{param_repo_url.name}=${param_repo_url.name};" && \
 echo "{param_pr_number.name}=${param_pr_number.name};" && \
+echo "{param_base_sha.name}=${param_base_sha.name};" && \
+echo "{param_head_sha.name}=${param_head_sha.name};" && \
+echo "{param_run_attempt.name}=${param_run_attempt.name};" && \
 echo "{param_author.name}=${param_author.name};" && \
 echo "{param_workflow_url.name}=${param_workflow_url.name};" && \
 echo "{param_workflow_run_id.name}=${param_workflow_run_id.name};" && \
@@ -47,48 +122,75 @@ echo "{param_triggered_at.name}=${param_triggered_at.name};"
         output="EXAMPLE",
     )
 
-    step_2 = ExecutorStep(
-        name="get-slack-integration",
-        description="Get Slack integration info from Kubiya",
-        output="SLACK_TOKEN",
+    step_1 = ExecutorStep(
+        name="install-tool-bundle",
+        description="Unpack the tool scripts onto the shared volume unless already there",
         depends=[step_0.name],
         executor=Executor(
-            type=ExecutorType.KUBIYA,
-            config=KubiyaExecutorConfig(
-                url="api/v2/integrations/slack",
-                method=HTTPMethod.GET,
+            type=ExecutorType.TOOL,
+            config=ToolExecutorConfig(
+                args={
+                    "bundle_dir": tool_bundle.root,
+                },
+                tool_def=ToolDef(
+                    name="install-tool-bundle",
+                    type="docker",
+                    image="python:3.12-slim",
+                    content="""set -e
+if [ ! -d "$bundle_dir" ]; then
+  mkdir -p "$(dirname "$bundle_dir")"
+  staging=$(mktemp -d "$bundle_dir.XXXXXX")
+  base64 -d /opt/scripts/tools.tar.gz.b64 | tar -xz -C "$staging"
+  chmod 755 "$staging"
+  # Another run may have installed it meanwhile
+  mv -T "$staging" "$bundle_dir" 2>/dev/null || rm -rf "$staging"
+fi
+""",
+                    with_files=[
+                        FileDefinition(
+                            destination="/opt/scripts/tools.tar.gz.b64",
+                            content=tool_bundle.encoded(),
+                        ),
+                    ],
+                    with_volumes=[
+                        shared_volume,
+                    ],
+                ),
             ),
         ),
     )
 
-    # TODO: Replace with implementation
     step_3_1 = ExecutorStep(
         name="get-gh-failed-logs",
         description="Get failed Workflow Run logs from GitHub",
         output="GH_FAILED_LOGS",
-        depends=[step_0.name],
+        depends=[step_1.name],
         executor=Executor(
             type=ExecutorType.TOOL,
             config=ToolExecutorConfig(
                 secrets={"GH_TOKEN": f"$GH_TOKEN"},
                 args={
-                    "file_path": "/shared/failed_logs.txt",
+                    "repo": f"${param_repo_url.name}",
+                    "run_id": f"${param_workflow_run_id.name}",
+                    "run_attempt": f"${param_run_attempt.name}",
+                    "job_id": f"${param_failed_job_id.name}",
+                    "file_path": f"{run_dir}/failed_logs.txt",
+                    "deadline_at": f"${param_deadline_at.name}",
                 },
                 tool_def=ToolDef(
                     name="get-gh-failed-logs",
                     type="docker",
                     image="python:3.12-slim",
                     secrets=["GH_TOKEN"],
-                    content=f"""echo 'Failed Logs: ...'""",
+                    content=f"""set -e
+pip install -qqq -r /opt/scripts/reqs.txt
+python {tool_bundle.script("gh", "get_failed_logs.py")} $repo $run_id $file_path --run-attempt $run_attempt --job-id "$job_id" --deadline "$deadline_at"
+""",
                     with_files=[
                         FileDefinition(
                             destination="/opt/scripts/reqs.txt",
                             content="requests==2.32.3",
                         ),
-                        FileDefinition(
-                            destination="/opt/scripts/get_diff.py",
-                            content=inspect.getsource(get_diff),
-                        ),
                     ],
                     with_volumes=[
                         shared_volume,
@@ -102,7 +204,7 @@ echo "{param_triggered_at.name}=${param_triggered_at.name};"
         name="get-gh-pr-diff",
         description="Get GitHub PR diff",
         output="GH_PR_DIFF",
-        depends=[step_0.name],
+        depends=[step_1.name],
         executor=Executor(
             type=ExecutorType.TOOL,
             config=ToolExecutorConfig(
@@ -110,7 +212,11 @@ echo "{param_triggered_at.name}=${param_triggered_at.name};"
                 args={
                     "repo": f"${param_repo_url.name}",
                     "number": f"${param_pr_number.name}",
-                    "file_path": "/shared/pr_diff.txt",
+                    "file_path": f"{run_dir}/pr_diff.txt",
+                    "base_sha": f"${param_base_sha.name}",
+                    "head_sha": f"${param_head_sha.name}",
+                    "cache_dir": DIFF_CACHE_DIR,
+                    "deadline_at": f"${param_deadline_at.name}",
                 },
                 tool_def=ToolDef(
                     name="github_pr_diff",
@@ -120,16 +226,13 @@ echo "{param_triggered_at.name}=${param_triggered_at.name};"
                     secrets=["GH_TOKEN"],
                     content=f"""set -e
 pip install -qqq -r /opt/scripts/reqs.txt
-python /opt/scripts/get_diff.py $repo $number $file_path""",
+python {tool_bundle.script("gh", "get_diff.py")} $repo $number $file_path --base-sha $base_sha --head-sha $head_sha --cache-dir $cache_dir --deadline "$deadline_at"
+""",
                     with_files=[
                         FileDefinition(
                             destination="/opt/scripts/reqs.txt",
                             content="requests==2.32.3",
                         ),
-                        FileDefinition(
-                            destination="/opt/scripts/get_diff.py",
-                            content=inspect.getsource(get_diff),
-                        ),
                     ],
                     with_volumes=[
                         shared_volume,
@@ -139,14 +242,53 @@ python /opt/scripts/get_diff.py $repo $number $file_path""",
         ),
     )
 
+    step_3_3 = ExecutorStep(
+        name="find-similar-failures",
+        description="Look up past failures similar to this one",
+        output="SIMILAR_FAILURES",
+        depends=[step_3_1.name],
+        executor=Executor(
+            type=ExecutorType.TOOL,
+            config=ToolExecutorConfig(
+                args={
+                    "db": FAILURE_INDEX_PATH,
+                    "logs": f"{run_dir}/failed_logs.txt",
+                    "repo": f"${param_repo_url.name}",
+                    "number": f"${param_pr_number.name}",
+                },
+                tool_def=ToolDef(
+                    name="find-similar-failures",
+                    type="docker",
+                    image="python:3.12-slim",
+                    content=f"""python {tool_bundle.script("gh", "failure_index.py")} --db $db --logs-path $logs --repo "$repo" --pr-number "$number"
+""",
+                    with_volumes=[
+                        shared_volume,
+                    ],
+                ),
+            ),
+        ),
+    )
+
+    early_analysis = ""
+    if prefetched_analysis:
+        early_analysis = f"""
+Earlier analysis of the first failed job, to extend to every failed job:
+{prefetched_analysis}
+"""
+
     step_4 = ExecutorStep(
         name="failure-analysis",
         description="Analyze the collected data and generate comprehensive failure report",
         depends=[
             step_3_1.name,
             step_3_2.name,
+            step_3_3.name,
         ],
         output="ANALYSIS_REPORT",
+        # A failed or timed out analysis must not stop the comment: the post
+        # step falls back to the log excerpt and diff summary.
+        continue_on=ContinueOn(failure=True),
         executor=Executor(
             type=ExecutorType.AGENT,
             config=AgentExecutorConfig(
@@ -155,7 +297,8 @@ python /opt/scripts/get_diff.py $repo $number $file_path""",
 
 PR Failed logs: ${step_3_1.output}
 PR Diff: ${step_3_2.output}
-
+Similar past failures: ${step_3_3.output}
+{early_analysis}
 Your task is to:
 1. Highlights key information first:
    - What failed
@@ -168,6 +311,9 @@ Your task is to:
    - Recommended fixes
    - Prevention strategies
 
+If a similar past failure is listed, say whether this looks like the same
+problem and link the earlier analysis.
+
 Format your response with clear sections and actionable insights.""",
             ),
         ),
@@ -181,14 +327,16 @@ Format your response with clear sections and actionable insights.""",
             type=ExecutorType.TOOL,
             config=ToolExecutorConfig(
                 args={
-                    "path": "/shared/analysis.txt",
+                    "path": f"{run_dir}/analysis.txt",
+                    "analysis": f"${step_4.output}",
                 },
                 tool_def=ToolDef(
                     name="save-pr-summary",
                     description="Shows github PR Diff",
                     type="docker",
                     image="python:3.12-slim",
-                    content=f"""python -c 'import os; with open(os.getenv("path"), "w") as f: f.write({step_4.output})'""",
+                    content="""mkdir -p "$(dirname "$path")" && printf '%s' "$analysis" > "$path"
+""",
                     with_volumes=[
                         shared_volume,
                     ],
@@ -199,7 +347,9 @@ Format your response with clear sections and actionable insights.""",
 
     step_5 = ExecutorStep(
         name="post-pr-summary",
-        depends=[step_4_1.name],
+        depends=(
+            [step_3_1.name, step_3_2.name] if known_flaky or degraded else [step_4_1.name]
+        ),
         output="PR_MESSAGE_URL",
         description="Post failure analysis comment on the GitHub PR",
         executor=Executor(
@@ -212,18 +362,13 @@ Format your response with clear sections and actionable insights.""",
                     image="python:3.12-slim",
                     secrets=["GH_TOKEN"],
                     content=f"""pip install -qqq -r /opt/scripts/requirements.txt
-python /opt/scripts/post_pr_comment.py --repo "$repo" --number "$number" --workflow-run-id "$workflow_run_id" --analysis-path $analysis --failed-logs-path $failed_logs
-echo $PR_COMMENT
+python {tool_bundle.script("gh", "post_pr_comment.py")} --repo "$repo" --number "$number" --workflow-run-id "$workflow_run_id" --analysis-path $analysis --failed-logs-path $failed_logs --diff-path $diff --workflow-name "$workflow_name" --failure-index $failure_index --known-flaky "$known_flaky" $degraded_flag --deadline "$deadline_at"
 """,
                     with_files=[
                         FileDefinition(
                             destination="/opt/scripts/requirements.txt",
                             content="requests==2.32.3",
                         ),
-                        FileDefinition(
-                            destination="/opt/scripts/post_pr_comment.py",
-                            content=inspect.getsource(post_pr_comment),
-                        ),
                     ],
                     with_volumes=[
                         shared_volume,
@@ -233,8 +378,14 @@ echo $PR_COMMENT
                     "repo": f"${param_repo_url.name}",
                     "number": f"${param_pr_number.name}",
                     "workflow_run_id": f"${param_workflow_run_id.name}",
-                    "analysis": "/shared/analysis.txt",
-                    "failed_logs": "/shared/failed_logs.txt",
+                    "analysis": f"{run_dir}/analysis.txt",
+                    "failed_logs": f"{run_dir}/failed_logs.txt",
+                    "diff": f"{run_dir}/pr_diff.txt",
+                    "workflow_name": f"${param_pipeline_name.name}",
+                    "failure_index": FAILURE_INDEX_PATH,
+                    "known_flaky": ",".join(known_flaky or []),
+                    "degraded_flag": "--degraded" if degraded else "",
+                    "deadline_at": f"${param_deadline_at.name}",
                 },
                 secrets={"GH_TOKEN": "$GH_TOKEN"},
             ),
@@ -248,64 +399,102 @@ echo $PR_COMMENT
         executor=Executor(
             type=ExecutorType.TOOL,
             config=ToolExecutorConfig(
+                args={
+                    "diff_index": f"{run_dir}/pr_diff.index.json",
+                },
                 tool_def=ToolDef(
                     name="send-ms-teams",
                     type="docker",
                     image="python:3.12-slim",
                     content=f"""set -e
 pip install -qqq -r /opt/scripts/reqs.txt
-python /opt/scripts/send_message.py $pipeline_name $(python /opt/scripts/prepare_summary.py $pr_title $pr_url $author $workflow_url ${step_5.output} --triggered-at "$triggered_at")
+python {tool_bundle.script("teams", "notify.py")} --pipeline-name "$pipeline_name" --pr-title "$pr_title" --pr-url "$pr_url" --author "$author" --workflow-url "$workflow_url" --gh-summary-url "${step_5.output}" --triggered-at "$triggered_at" --diff-index $diff_index
 """,
                     with_files=[
                         FileDefinition(
                             destination="/opt/scripts/reqs.txt", content="httpx==0.28.1"
                         ),
-                        FileDefinition(
-                            destination="/opt/scripts/webhook_config.py",
-                            content=inspect.getsource(webhook_config),
-                        ),
-                        FileDefinition(
-                            destination="/opt/scripts/send_message.py",
-                            content=inspect.getsource(send_message),
-                        ),
-                        FileDefinition(
-                            destination="/opt/scripts/prepare_summary.py",
-                            content=inspect.getsource(prepare_summary),
-                        ),
+                    ],
+                    with_volumes=[
+                        shared_volume,
                     ],
                 ),
             ),
         ),
     )
 
+    params = [
+        param_pipeline_name,
+        param_pr_title,
+        param_pr_url,
+        param_repo_url,
+        param_pr_number,
+        param_base_sha,
+        param_head_sha,
+        param_run_attempt,
+        param_author,
+        param_workflow_url,
+        param_workflow_run_id,
+        param_triggered_at,
+        param_deadline_at,
+        param_failed_job_id,
+    ]
+    steps = [
+        step_0,
+        step_1,
+        step_3_1,
+        step_3_2,
+        step_3_3,
+        step_4,
+        step_4_1,
+        step_5,
+        step_6,
+    ]
+    if prefetch:
+        steps = [step_0, step_1, step_3_1, step_3_2, step_3_3, step_4]
+    elif known_flaky:
+        steps = [step_0, step_1, step_3_1, step_3_2, step_5]
+    elif degraded:
+        steps = [step_0, step_1, step_3_1, step_3_2, step_5, step_6]
+    elif shared_analysis:
+        completed_steps = {**(completed_steps or {}), step_4.name: shared_analysis}
+
+    budgets = STEP_TIMEOUTS
+    if deadline is not None:
+        budgets = deadline.plan(
+            [(step.name, list(step.depends or [])) for step in steps],
+            STEP_TIMEOUTS,
+            protected=PROTECTED_STEPS,
+            exempt=DEADLINE_EXEMPT_STEPS,
+        )
+    for step in steps:
+        step.timeout_sec = budgets[step.name]
+
+    if memo_plan is not None:
+        steps = memo_plan.apply(
+            steps,
+            # The deadline changes on every event and must not defeat memoization
+            params={
+                param.name: param.value for param in params if param is not param_deadline_at
+            },
+            volume_writers=[step_1.name, step_3_1.name, step_3_2.name, step_4_1.name],
+            completed=completed_steps,
+            side_effects=SIDE_EFFECT_STEPS,
+            # Each attempt writes to its own directory, but a rerun at the same
+            # SHA should still reuse the diff; steps reading the directory's
+            # files keep the attempt in their key
+            aliases={run_dir: f"{RUNS_DIR}/<run>"},
+        )
+
     workflow = Workflow(
         name="prototype-workflow",
         description="Prototype workflow to demonstrate alternative implementation",
-        steps=[
-            step_0,
-            step_2,
-            step_3_1,
-            step_3_2,
-            step_4,
-            step_4_1,
-            step_5,
-        ],
-        params=WorkflowParams(
-            [
-                param_pipeline_name,
-                param_pr_title,
-                param_pr_url,
-                param_repo_url,
-                param_pr_number,
-                param_author,
-                param_workflow_url,
-                param_workflow_run_id,
-                param_triggered_at,
-            ]
-        ),
+        steps=steps,
+        params=WorkflowParams(params),
         secrets=WorkflowSecrets(
             [
                 Secret(name="GH_TOKEN", value=GH_TOKEN),
+                *(Secret(name=name, value=value) for name, value in (secrets or {}).items()),
             ]
         ),
     )